@@ -0,0 +1,148 @@
+"""Per-event dispatch cost of the old handleEvent path versus the routing table.
+
+Before, a state change went handleEvent -> updateValueReport ->
+handlerDomain[domain].getReport, splitting the entity_id on the way and
+scanning SUPPORTED_DOMAINS, and the handler then looked the entity up in its
+own valueList. After, WappstoIoTApi.handleEvent does one lookup in routes and
+hands the prebound Value to the handler.
+
+Both paths end in the same HandleSwitch report mapping, with a stand-in
+report queue that only counts, so only the dispatch differs. The routes
+path also runs hasReportChange and stamps the report time, which the old
+path did not, so its advantage is understated rather than overstated.
+
+    python benchmarks/event_dispatch.py [--entities 400] [--events 500000]
+
+Needs the integration's requirements (homeassistant, wappstoiot).
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.wappsto.const import SUPPORTED_DOMAINS  # noqa: E402
+from custom_components.wappsto.to_wappsto.api import WappstoIoTApi  # noqa: E402
+from custom_components.wappsto.to_wappsto.handle_switch import HandleSwitch  # noqa: E402
+from custom_components.wappsto.to_wappsto.handler import Route  # noqa: E402
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StandInQueue:
+    def __init__(self):
+        self.reports = 0
+
+    def report(self, value, data, timestamp=None, coalesce=True):
+        self.reports += 1
+
+
+class OldHandleSwitch:
+    """The handler as it was, keyed on entity_id in its own valueList."""
+
+    def __init__(self, report_queue):
+        self.reportQueue = report_queue
+        self.valueList = {}
+
+    def getReport(self, domain, entity_id, data, event):
+        if not entity_id in self.valueList:
+            return
+        self.reportQueue.report(self.valueList[entity_id], "1" if data == "on" else "0")
+
+
+class OldApi:
+    """handleEvent and updateValueReport as they were."""
+
+    def __init__(self, handler):
+        self.handlerDomain = {"switch": handler}
+
+    def handleEvent(self, event):
+        entity_id = event.data.get("entity_id", "")
+        _LOGGER.info("Event id: %s [%s]", entity_id, event)
+        (entity_type, entity_name) = entity_id.split(".")
+        if entity_type in SUPPORTED_DOMAINS:
+            self.updateValueReport(entity_id, event)
+
+    def updateValueReport(self, entity_id, event):
+        if not event.data["new_state"]:
+            return
+        testing = event.data["new_state"].state
+        (entity_type, entity_name) = entity_id.split(".")
+        self.handlerDomain[entity_type].getReport(
+            entity_type, entity_id, testing, event
+        )
+
+
+def state(data: str):
+    return SimpleNamespace(state=data, attributes={}, last_updated=datetime.now(timezone.utc))
+
+
+def make_events(entity_ids: list[str], count: int) -> list:
+    rand = random.Random(0)
+    events = []
+    for _ in range(count):
+        entity_id = rand.choice(entity_ids)
+        events.append(
+            SimpleNamespace(
+                data={
+                    "entity_id": entity_id,
+                    "old_state": state("off"),
+                    "new_state": state("on"),
+                }
+            )
+        )
+    return events
+
+
+def run_old(entity_ids, events):
+    queue = StandInQueue()
+    handler = OldHandleSwitch(queue)
+    handler.valueList = {entity_id: object() for entity_id in entity_ids}
+    api = OldApi(handler)
+    start = time.perf_counter()
+    for event in events:
+        api.handleEvent(event)
+    return time.perf_counter() - start, queue.reports
+
+
+def run_new(entity_ids, events):
+    queue = StandInQueue()
+    handler = HandleSwitch(None, queue)
+    routes = {}
+    for entity_id in entity_ids:
+        routes[entity_id] = Route(handler)
+        routes[entity_id].value = object()
+    api = SimpleNamespace(routes=routes)
+    handle_event = WappstoIoTApi.handleEvent
+    start = time.perf_counter()
+    for event in events:
+        handle_event(api, event)
+    return time.perf_counter() - start, queue.reports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entities", type=int, default=400)
+    parser.add_argument("--events", type=int, default=500000)
+    args = parser.parse_args()
+
+    entity_ids = [f"switch.entity_{index}" for index in range(args.entities)]
+    events = make_events(entity_ids, args.events)
+
+    results = {}
+    for (mode, run) in (("handleEvent", run_old), ("routes", run_new)):
+        (elapsed, reports) = run(entity_ids, events)
+        if reports != args.events:
+            sys.exit(f"{mode}: {reports} of {args.events} events were reported")
+        results[mode] = elapsed / args.events
+        print(f"{mode:>11}: {results[mode] * 1e9:.0f} ns per event")
+    print(f"speedup: {results['handleEvent'] / results['routes']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
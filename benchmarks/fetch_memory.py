@@ -0,0 +1,171 @@
+"""Event loop blocking and peak memory of WappstoApi.get_device on large devices.
+
+get_device decodes the device response and parses its values with
+_read_json, which hands bodies above JSON_EXECUTOR_THRESHOLD to the
+executor. Devices with a growing number of values are fetched with that
+offload, and with the threshold raised so every body is decoded on the loop,
+as resp.json() did before.
+
+The offload takes the parsing of the values off the loop, but the JSON
+decoder is C code that holds the GIL for the whole body, so for bodies of
+several MiB the loop still waits for the decode itself. Peak memory is the
+body plus its decoded tree either way; it grows with the device, not with
+the account, as devices are fetched one at a time.
+
+The response is served from memory by a stand-in for the HTTP client, on a
+real Home Assistant instance. A probe on the loop records the longest time
+the loop was blocked; peak memory is measured with tracemalloc in a separate
+pass, as it slows the decoding down. Each mode keeps its best of --repeat
+runs.
+
+    python benchmarks/fetch_memory.py [--values 100 1000 4000 16000] [--repeat 3]
+
+Needs the integration's requirements (homeassistant, wappstoiot). Exits with
+an error if the offload does not lower the loop blocking of the largest
+device.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.wappsto.from_wappsto import api as api_module  # noqa: E402
+from custom_components.wappsto.from_wappsto.api import WappstoApi  # noqa: E402
+
+TICK = 0.001
+
+
+class StandInResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self) -> bytes:
+        # Let other tasks run, as a read from the network would.
+        await asyncio.sleep(0)
+        return self.body
+
+
+class StandInClient:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def get(self, url, headers=None, params=None):
+        return StandInResponse(self.body)
+
+
+def device_body(device_id: str, values: int) -> bytes:
+    return json.dumps(
+        {
+            "meta": {
+                "id": device_id,
+                "type": "device",
+                "name_by_user": device_id,
+                "parent_name_by_user": {"network": "network"},
+            },
+            "name": device_id,
+            "value": [
+                {
+                    "meta": {"id": f"{device_id}-value-{index}", "type": "value"},
+                    "name": f"Value {index}",
+                    "type": "temperature",
+                    "permission": "rw",
+                    "number": {"min": -40, "max": 125, "step": 0.1, "unit": "°C"},
+                    "state": [
+                        {
+                            "meta": {"id": f"{device_id}-{index}-{state_type}", "type": "state"},
+                            "type": state_type,
+                            "data": "21.5",
+                            "timestamp": "2024-01-01T00:00:00.000000Z",
+                        }
+                        for state_type in ("Report", "Control")
+                    ],
+                }
+                for index in range(values)
+            ],
+        }
+    ).encode()
+
+
+async def probe(stop: asyncio.Event) -> float:
+    blocked = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        blocked = max(blocked, time.perf_counter() - start - TICK)
+    return blocked
+
+
+async def fetch(body: bytes, values: int, trace: bool) -> tuple[float, int]:
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        entry = SimpleNamespace(entry_id="benchmark", data={"session": "session"}, options={})
+        api = WappstoApi(hass, entry)
+        api.client = StandInClient(body)
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(stop))
+        await asyncio.sleep(TICK)
+        if trace:
+            tracemalloc.start()
+        device = await api.get_device("device")
+        peak = 0
+        if trace:
+            (current, peak) = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        stop.set()
+        blocked = await probe_task
+        if len(device.values) != values:
+            sys.exit(f"{len(device.values)} of {values} values were fetched")
+        await hass.async_stop(force=True)
+        return blocked, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--values", type=int, nargs="+", default=[100, 1000, 4000, 16000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    # The device fetch is logged at warning level.
+    logging.disable(logging.WARNING)
+    threshold = api_module.JSON_EXECUTOR_THRESHOLD
+
+    blocking = {}
+    for values in args.values:
+        body = device_body("device", values)
+        for (mode, mode_threshold) in (("loop", float("inf")), ("executor", threshold)):
+            api_module.JSON_EXECUTOR_THRESHOLD = mode_threshold
+            blocked = min(
+                asyncio.run(fetch(body, values, False))[0] for _ in range(args.repeat)
+            )
+            (_, peak) = asyncio.run(fetch(body, values, True))
+            blocking.setdefault(mode, []).append(blocked)
+            print(
+                f"{values:>6} values ({len(body) / 2**10:>6.0f} KiB) {mode:>8}: "
+                f"loop blocked up to {blocked * 1000:.1f} ms, peak {peak / 2**20:.1f} MiB"
+            )
+    api_module.JSON_EXECUTOR_THRESHOLD = threshold
+
+    if blocking["executor"][-1] >= blocking["loop"][-1]:
+        sys.exit("the executor does not lower the loop blocking of the largest device")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Event loop latency with wappstoiot calls inline versus on the WappstoWorker.
+
+A probe on the loop sleeps for a fixed tick and records how late it wakes up,
+while state changes arrive at a steady rate. Each state change makes one call
+that blocks for a round trip, like wappstoiot's createValue and report do.
+Before, the call runs inside the loop callback; after, the callback only
+submits it to the WappstoWorker thread.
+
+    python benchmarks/loop_latency.py [--latency 0.02] [--rate 20] [--duration 3]
+
+Needs the integration's requirements (homeassistant, wappstoiot). Exits with
+an error if the worker does not lower the worst loop latency.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.wappsto.to_wappsto.worker import WappstoWorker  # noqa: E402
+
+TICK = 0.005
+
+
+def blocking_call(latency: float):
+    """Stand-in for a wappstoiot call waiting on its reply."""
+    time.sleep(latency)
+
+
+async def probe(stop: asyncio.Event) -> list[float]:
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+    return lags
+
+
+async def run(worker: WappstoWorker | None, latency: float, rate: float, duration: float):
+    loop = asyncio.get_running_loop()
+
+    def state_changed():
+        if worker is None:
+            blocking_call(latency)
+        else:
+            worker.submit(blocking_call, latency)
+
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(stop))
+    start = loop.time()
+    for index in range(int(rate * duration)):
+        loop.call_at(start + index / rate, state_changed)
+    await asyncio.sleep(duration)
+    stop.set()
+    return await probe_task
+
+
+def summary(lags: list[float]) -> dict[str, float]:
+    lags = sorted(lags)
+    return {
+        "mean": statistics.fmean(lags),
+        "p99": lags[int(len(lags) * 0.99) - 1],
+        "max": lags[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--rate", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("inline", "worker"):
+        worker = WappstoWorker() if mode == "worker" else None
+        lags = asyncio.run(run(worker, args.latency, args.rate, args.duration))
+        if worker is not None:
+            worker.stop()
+            worker.join()
+        results[mode] = summary(lags)
+        print(
+            f"{mode:>6}: {len(lags)} ticks, "
+            + ", ".join(
+                f"{name} lag {seconds * 1000:.1f} ms"
+                for (name, seconds) in results[mode].items()
+            )
+        )
+
+    if results["worker"]["max"] >= results["inline"]["max"]:
+        sys.exit("the worker does not lower the worst loop latency")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Report throughput of ReportQueue against a local stand-in for Wappsto IoT.
+
+The stand-in is a TCP server that acknowledges each report after a fixed
+delay, like the round trip to the Wappsto IoT endpoint. Each value's report
+blocks until its acknowledgement, as wappstoiot's Value.report does, so
+throughput is bounded by the number of reports in flight.
+
+    python benchmarks/report_throughput.py [--latency 0.02] [--values 50] [--reports 20]
+
+Needs the integration's requirements (homeassistant, wappstoiot). Exits with
+an error if pipelined mode is not faster than sequential mode.
+"""
+import argparse
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.wappsto.to_wappsto.report_queue import ReportQueue  # noqa: E402
+from custom_components.wappsto.to_wappsto.worker import WappstoWorker  # noqa: E402
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            time.sleep(self.server.latency)
+            self.server.count(int(line))
+            self.wfile.write(b"ok\n")
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.latency = latency
+        self.requests = 0
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def count(self, samples: int):
+        with self._lock:
+            self.requests += 1
+            self.samples += samples
+
+
+class StandInValue:
+    """Stand-in for wappstoiot.Value, reporting over a blocking round trip."""
+
+    _local = threading.local()
+
+    def __init__(self, address, name: str):
+        self.address = address
+        self.name = name
+
+    def _connection(self):
+        if getattr(self._local, "file", None) is None:
+            sock = socket.create_connection(self.address)
+            self._local.file = sock.makefile("rwb")
+        return self._local.file
+
+    def report(self, data, timestamp=None):
+        samples = len(data) if isinstance(data, list) else 1
+        connection = self._connection()
+        connection.write(f"{samples}\n".encode())
+        connection.flush()
+        connection.readline()
+
+
+def run(address, values: int, reports: int, max_in_flight: int) -> tuple[float, int]:
+    worker = WappstoWorker()
+    queue = ReportQueue(None, worker, 0, max_in_flight)
+    stand_ins = [StandInValue(address, f"value {index}") for index in range(values)]
+    start = time.perf_counter()
+    for report in range(reports):
+        for value in stand_ins:
+            queue.report(value, report)
+    queue.close()
+    worker.stop()
+    worker.join()
+    return time.perf_counter() - start, values * reports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--values", type=int, default=50)
+    parser.add_argument("--reports", type=int, default=20)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    args = parser.parse_args()
+
+    server = StandInServer(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = {}
+    for (mode, max_in_flight) in (("sequential", 1), ("pipelined", args.max_in_flight)):
+        server.requests = server.samples = 0
+        (elapsed, reported) = run(
+            server.server_address, args.values, args.reports, max_in_flight
+        )
+        if server.samples != reported:
+            sys.exit(f"{mode}: {server.samples} of {reported} reports arrived")
+        results[mode] = reported / elapsed
+        print(
+            f"{mode:>10}: {reported} reports in {server.requests} requests, "
+            f"{elapsed:.2f} s, {results[mode]:.0f} reports/s"
+        )
+    server.shutdown()
+
+    if results["pipelined"] <= results["sequential"]:
+        sys.exit("pipelined mode is not faster than sequential mode")
+
+
+if __name__ == "__main__":
+    main()
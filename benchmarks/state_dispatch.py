@@ -0,0 +1,183 @@
+"""Cost per state_changed event of listening to all entities versus the exported ones.
+
+Both modes run on a real Home Assistant event bus. Before, the exporter
+listened to every EVENT_STATE_CHANGED, split each entity_id, checked its
+domain and let the handler look the entity up in its own value list. After,
+WappstoIoTApi.trackEntityList installs async_track_state_change_event for the
+exported entities, and WappstoIoTApi.handleEvent is only called for those.
+
+The events are drawn uniformly from all entities, as on a busy instance. A
+run without any listener gives the cost of the bus itself, which is taken
+off to show the cost of the listener per event. Times are CPU time of the
+loop's thread, and each mode keeps its best of --repeat interleaved runs.
+All routes use the switch handler with a report queue that only counts, so
+only the dispatch is measured.
+
+    python benchmarks/state_dispatch.py [--entities 6000] [--exported 400] [--events 100000] [--repeat 5]
+
+Needs the integration's requirements (homeassistant, wappstoiot). Exits with
+an error if the two modes do not report the same state changes.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.const import EVENT_STATE_CHANGED  # noqa: E402
+from homeassistant.core import HomeAssistant, State, callback  # noqa: E402
+
+from custom_components.wappsto.const import SUPPORTED_DOMAINS  # noqa: E402
+from custom_components.wappsto.to_wappsto.api import WappstoIoTApi  # noqa: E402
+from custom_components.wappsto.to_wappsto.handle_switch import HandleSwitch  # noqa: E402
+from custom_components.wappsto.to_wappsto.handler import Route  # noqa: E402
+
+_LOGGER = logging.getLogger(__name__)
+
+DOMAINS = ["sensor", "light", "switch", "binary_sensor", "automation", "sun", "zone"]
+
+
+class StandInQueue:
+    def __init__(self):
+        self.reports = 0
+
+    def report(self, value, data, timestamp=None, coalesce=True):
+        self.reports += 1
+
+
+class OldHandleSwitch:
+    """The handler as it was, keyed on entity_id in its own valueList."""
+
+    def __init__(self, report_queue):
+        self.reportQueue = report_queue
+        self.valueList = {}
+
+    def getReport(self, domain, entity_id, data, event):
+        if not entity_id in self.valueList:
+            return
+        self.reportQueue.report(self.valueList[entity_id], "1" if data == "on" else "0")
+
+
+class OldApi:
+    """handleEvent and updateValueReport as they were."""
+
+    def __init__(self, handler):
+        self.handlerDomain = dict.fromkeys(SUPPORTED_DOMAINS, handler)
+
+    @callback
+    def handleEvent(self, event):
+        entity_id = event.data.get("entity_id", "")
+        _LOGGER.info("Event id: %s [%s]", entity_id, event)
+        (entity_type, entity_name) = entity_id.split(".")
+        if entity_type in SUPPORTED_DOMAINS:
+            self.updateValueReport(entity_id, event)
+
+    def updateValueReport(self, entity_id, event):
+        if not event.data["new_state"]:
+            return
+        testing = event.data["new_state"].state
+        (entity_type, entity_name) = entity_id.split(".")
+        self.handlerDomain[entity_type].getReport(
+            entity_type, entity_id, testing, event
+        )
+
+
+def listen_all(hass: HomeAssistant, exported: list[str], queue: StandInQueue):
+    handler = OldHandleSwitch(queue)
+    handler.valueList = {entity_id: object() for entity_id in exported}
+    return hass.bus.async_listen(EVENT_STATE_CHANGED, OldApi(handler).handleEvent)
+
+
+def track_exported(hass: HomeAssistant, exported: list[str], queue: StandInQueue):
+    handler = HandleSwitch(hass, queue)
+    api = WappstoIoTApi.__new__(WappstoIoTApi)
+    api.hass = hass
+    api.entity_list = exported
+    api.routes = {}
+    api._unsub_state_tracker = None
+    for entity_id in exported:
+        api.routes[entity_id] = Route(handler)
+        api.routes[entity_id].value = object()
+    api.trackEntityList()
+    return api._unsub_state_tracker
+
+
+LISTENERS = {
+    # Firing the events with no listener, the cost of the bus itself.
+    "none": lambda hass, exported, queue: lambda: None,
+    "all": listen_all,
+    "exported": track_exported,
+}
+
+
+async def run(mode: str, entity_ids: list[str], exported: list[str], events: list[int]):
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        queue = StandInQueue()
+        unsub = LISTENERS[mode](hass, exported, queue)
+        states = [
+            (State(entity_id, "off"), State(entity_id, "on")) for entity_id in entity_ids
+        ]
+        # CPU time of the loop's thread, other load on the machine is left out.
+        start = time.thread_time()
+        for (number, index) in enumerate(events):
+            (old_state, new_state) = states[index]
+            hass.bus.async_fire(
+                EVENT_STATE_CHANGED,
+                {"entity_id": new_state.entity_id, "old_state": old_state, "new_state": new_state},
+            )
+            # Let the loop run the listeners, as it does between state writes.
+            if number % 100 == 0:
+                await hass.async_block_till_done()
+        await hass.async_block_till_done()
+        elapsed = time.thread_time() - start
+        unsub()
+        await hass.async_stop(force=True)
+        return elapsed, queue.reports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entities", type=int, default=6000)
+    parser.add_argument("--exported", type=int, default=400)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    entity_ids = [
+        f"{DOMAINS[index % len(DOMAINS)]}.entity_{index}"
+        for index in range(args.entities)
+    ]
+    # Only entities of the supported domains can be picked for export.
+    exportable = [
+        entity_id
+        for entity_id in entity_ids
+        if entity_id.split(".")[0] in SUPPORTED_DOMAINS
+    ]
+    exported = rand.sample(exportable, args.exported)
+    events = [rand.randrange(args.entities) for _ in range(args.events)]
+
+    results = {}
+    reports = {}
+    for _ in range(args.repeat):
+        for mode in LISTENERS:
+            (elapsed, reports[mode]) = asyncio.run(run(mode, entity_ids, exported, events))
+            results[mode] = min(results.get(mode, elapsed), elapsed)
+    for mode in ("all", "exported"):
+        print(
+            f"{mode:>8}: {reports[mode]} reports, "
+            f"{results[mode] / args.events * 1e6:.2f} us per bus event, "
+            f"{(results[mode] - results['none']) / args.events * 1e6:.2f} us of it in the listener"
+        )
+    if reports["all"] != reports["exported"]:
+        sys.exit("both modes must report the same state changes")
+
+
+if __name__ == "__main__":
+    main()
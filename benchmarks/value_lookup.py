@@ -0,0 +1,128 @@
+"""Per-message dispatch cost of scanning the devices versus the value index.
+
+Before, WappstoApi._on_wappsto_update looked a value up by calling
+get_value on every imported device until one matched, so each websocket
+update cost O(devices). After, it is one lookup in the value index built by
+get_device. Both paths set the data and call one update callback per value.
+
+    python benchmarks/value_lookup.py [--devices 1000] [--values 20] [--messages 20000]
+
+Needs the integration's requirements (homeassistant, wappstoiot).
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.wappsto.from_wappsto.api import WappstoApi  # noqa: E402
+from custom_components.wappsto.from_wappsto.wappsto_device import (  # noqa: E402
+    WappstoDevice,
+    WappstoValue,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ScanningApi:
+    """_on_wappsto_update as it was, scanning the devices."""
+
+    def __init__(self, devices: dict[str, WappstoDevice]):
+        self.wappsto_devices = devices
+        self._update_callbacks = {}
+
+    def _on_wappsto_update(self, value_id, data):
+        _LOGGER.warning("Received update for %s: %s", value_id, data)
+        for device in self.wappsto_devices.values():
+            if value := device.get_value(value_id):
+                value.data = data
+                if value_id in self._update_callbacks:
+                    for callback in self._update_callbacks[value_id]:
+                        callback()
+                break
+
+
+def make_devices(devices: int, values: int) -> dict[str, WappstoDevice]:
+    result = {}
+    for device_index in range(devices):
+        device_id = f"device-{device_index}"
+        result[device_id] = WappstoDevice(
+            device_id,
+            device_id,
+            {
+                f"{device_id}-value-{index}": WappstoValue(
+                    f"{device_id}-value-{index}",
+                    f"value {index}",
+                    "number",
+                    "r",
+                    state_read=f"{device_id}-state-{index}",
+                )
+                for index in range(values)
+            },
+        )
+    return result
+
+
+def indexed_api(devices: dict[str, WappstoDevice]) -> WappstoApi:
+    """A WappstoApi with only what the websocket path uses, without Home Assistant."""
+    api = WappstoApi.__new__(WappstoApi)
+    api.wappsto_devices = devices
+    api._value_index = {}
+    api._state_index = {}
+    api._pending_echoes = {}
+    api.write_interval = 0
+    api._subscribe = lambda paths: None
+    api._schedule_save = lambda: None
+    for device in devices.values():
+        api._index_device(device)
+    return api
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--values", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    # The update is logged at warning level, which would swamp the timing.
+    logging.disable(logging.WARNING)
+
+    rand = random.Random(0)
+    value_ids = [
+        f"device-{rand.randrange(args.devices)}-value-{rand.randrange(args.values)}"
+        for _ in range(args.messages)
+    ]
+
+    results = {}
+    for mode in ("scan", "index"):
+        devices = make_devices(args.devices, args.values)
+        calls = [0]
+
+        def update_callback():
+            calls[0] += 1
+
+        if mode == "scan":
+            api = ScanningApi(devices)
+            for device in devices.values():
+                for value_id in device.values:
+                    api._update_callbacks[value_id] = [update_callback]
+        else:
+            api = indexed_api(devices)
+            for value_id in api._value_index:
+                api.register_update_callback(value_id, update_callback)
+        start = time.perf_counter()
+        for (number, value_id) in enumerate(value_ids):
+            api._on_wappsto_update(value_id, str(number))
+        elapsed = time.perf_counter() - start
+        if calls[0] != args.messages:
+            sys.exit(f"{mode}: {calls[0]} of {args.messages} updates were dispatched")
+        results[mode] = elapsed / args.messages
+        print(f"{mode:>5}: {results[mode] * 1e6:.2f} us per message")
+    print(f"speedup: {results['scan'] / results['index']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
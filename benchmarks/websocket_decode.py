@@ -0,0 +1,146 @@
+"""Replay websocket frames through the old decode and WappstoApi._decode_update.
+
+Before, every frame was fully parsed with json.loads and its path split
+before deciding whether it was relevant. After, _decode_update drops frames
+of other events and of states that are not imported by string checks and a
+precompiled path pattern, and only parses the rest, with Home Assistant's
+JSON backend (orjson).
+
+Frames are read from a recording, one frame per line, or generated like the
+ones the Wappsto websocket sends for a network subscription. A share of the
+Report states seen is taken as imported.
+
+    python benchmarks/websocket_decode.py [--frames recording.jsonl] [--count 100000] [--imported 0.2]
+
+The old decoder returns an update for every update frame, including Control
+states and values that are not imported. Exits with an error if
+_decode_update does not return exactly the updates of the imported Report
+states.
+
+Needs the integration's requirements (homeassistant, wappstoiot).
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.wappsto.from_wappsto.api import WappstoApi  # noqa: E402
+
+
+def decode_before(message):
+    """The decoding of start_websocket as it was."""
+    data = json.loads(message)
+    if data.get("event") == "update" and data.get("data"):
+        if data["data"].get("data") is None:
+            return None
+        new_data = data["data"]["data"]
+        # /network/<network-id>/device/<device-id>/value/<value-id>/state/<state-id>
+        value_id = data["path"].split("/")[6]
+        return value_id, new_data
+
+
+def make_frames(count: int, rand: random.Random) -> list[str]:
+    network = str(uuid.UUID(int=rand.getrandbits(128)))
+    states = []
+    for _ in range(200):
+        (device, value) = (uuid.UUID(int=rand.getrandbits(128)) for _ in range(2))
+        for state_type in ("Report", "Control"):
+            states.append((device, value, uuid.UUID(int=rand.getrandbits(128)), state_type))
+    frames = []
+    for index in range(count):
+        (device, value, state, state_type) = rand.choice(states)
+        path = f"/network/{network}/device/{device}/value/{value}/state/{state}"
+        frames.append(
+            json.dumps(
+                {
+                    "data": {
+                        "meta": {"id": str(state), "type": "state", "version": "2.1"},
+                        "data": f"{rand.uniform(0, 100):.2f}",
+                        "type": state_type,
+                        "timestamp": f"2024-01-01T00:00:{index % 60:02d}.000000Z",
+                    },
+                    "event": rand.choice(("update", "update", "update", "create")),
+                    "meta": {"id": str(uuid.uuid4()), "type": "eventstream", "version": "2.1"},
+                    "meta_object": {"type": "state", "version": "2.1", "id": str(state)},
+                    "path": path,
+                    "timestamp": "2024-01-01T00:00:00.000000Z",
+                }
+            )
+        )
+    return frames
+
+
+def report_states(frames: list[str]) -> dict[str, str]:
+    """State id -> value id of the Report states in the frames."""
+    states = {}
+    for frame in frames:
+        data = json.loads(frame)
+        parts = data.get("path", "").split("/")
+        if len(parts) == 9 and data.get("data", {}).get("type") == "Report":
+            states[parts[8]] = parts[6]
+    return states
+
+
+def expected_updates(frames: list[str], imported: dict[str, str]) -> list:
+    updates = []
+    for frame in frames:
+        data = json.loads(frame)
+        state_id = data.get("path", "").rsplit("/", 1)[-1]
+        state = data.get("data")
+        if data.get("event") != "update" or state_id not in imported:
+            continue
+        if isinstance(state, dict) and state.get("data") is not None:
+            updates.append((imported[state_id], state["data"]))
+    return updates
+
+
+def replay(decode, frames: list[str]) -> tuple[float, float, list]:
+    updates = []
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for frame in frames:
+        if (update := decode(frame)) is not None:
+            updates.append(update)
+    return time.perf_counter() - wall, time.process_time() - cpu, updates
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=Path)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--imported", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    if args.frames:
+        frames = args.frames.read_text().splitlines()
+    else:
+        frames = make_frames(args.count, rand)
+    states = report_states(frames)
+    imported = dict(rand.sample(sorted(states.items()), int(len(states) * args.imported)))
+
+    api = WappstoApi.__new__(WappstoApi)
+    api._state_index = imported
+
+    results = {}
+    for (mode, decode) in (("json.loads", decode_before), ("_decode_update", api._decode_update)):
+        (wall, cpu, updates) = replay(decode, frames)
+        results[mode] = len(frames) / wall
+        print(
+            f"{mode:>14}: {len(frames)} frames, {len(updates)} updates, "
+            f"{results[mode]:.0f} frames/s, {cpu / len(frames) * 1e6:.2f} us CPU per frame"
+        )
+        if mode == "_decode_update" and [
+            (value_id, data) for (value_id, data, timestamp) in updates
+        ] != expected_updates(frames, imported):
+            sys.exit("_decode_update did not find the updates of the imported states")
+    print(f"speedup: {results['_decode_update'] / results['json.loads']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
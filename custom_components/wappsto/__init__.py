@@ -1,21 +1,20 @@
 """The Wappsto integration."""
+import asyncio
 import logging
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryNotReady
 
 from .binary_sensor import wappsto_connected_sensor
-from .const import (
-    DOMAIN,
-    ENTITY_LIST,
-)
+from .const import DOMAIN, IMPORT_PLATFORMS
 from .from_wappsto.api import WappstoApi
 from .setup_network import (
     create_certificaties_files_if_not_exist,
     delete_certificate_files,
 )
 from .to_wappsto.api import WappstoIoTApi
+from .to_wappsto.manifest import ProvisionManifest
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -25,12 +24,6 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     return True
 
 
-async def update_listener(hass, entry):
-    """Handle options update."""
-    _LOGGER.error("UPDATE CONFIG NOT HANDLED: [%s]", entry.options)
-    hass.data[DOMAIN][entry.entry_id].updateEntityList(entry.options[ENTITY_LIST])
-
-
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up this integration using UI."""
     conf = entry.data
@@ -50,43 +43,69 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     _LOGGER.info("STARTUP config: [%s]", entry.options)
     entry.async_on_unload(entry.add_update_listener(update_listener))
 
-    to_wappsto_api = WappstoIoTApi(hass, entry)
+    manifest = ProvisionManifest(hass, entry)
+    await manifest.async_load()
+    to_wappsto_api = WappstoIoTApi(hass, entry, manifest)
+    try:
+        await asyncio.wrap_future(to_wappsto_api.connected)
+    except Exception as err:
+        to_wappsto_api.close()
+        raise ConfigEntryNotReady(f"Could not connect to Wappsto: {err}") from err
     from_wappsto_api = WappstoApi(hass, entry)
+    await from_wappsto_api.async_load_catalog()
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
         "to_wappsto": to_wappsto_api,
         "from_wappsto": from_wappsto_api,
     }
 
-    platforms = []
     if entry.options.get("import_devices"):
-        platforms.append(Platform.SENSOR)
-        platforms.append(Platform.SWITCH)
-
-    if platforms:
-        await hass.config_entries.async_forward_entry_setups(entry, platforms)
+        await hass.config_entries.async_forward_entry_setups(entry, IMPORT_PLATFORMS)
 
-    hass.async_create_task(from_wappsto_api.start_websocket())
+    from_wappsto_api.start()
 
-    entry.async_on_unload(entry.add_update_listener(update_listener))
     return True
 
 
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
     """Handle options update."""
     _LOGGER.debug("Handling Wappsto options update")
-    await hass.config_entries.async_reload(entry.entry_id)
+    to_wappsto_api: WappstoIoTApi = hass.data[DOMAIN][entry.entry_id]["to_wappsto"]
+    if not to_wappsto_api.updateOptions(entry.options):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    # The websocket stays open, only its subscriptions and the platforms change.
+    from_wappsto_api: WappstoApi = hass.data[DOMAIN][entry.entry_id]["from_wappsto"]
+    await from_wappsto_api.async_update_imported_devices(
+        entry.options.get("import_devices", [])
+    )
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Handle removal of an entry."""
     _LOGGER.info("Async_unload_entry - disconnect and clear certificates")
+    from_wappsto_api: WappstoApi = hass.data[DOMAIN][entry.entry_id]["from_wappsto"]
+    if from_wappsto_api.imported_devices:
+        if not await hass.config_entries.async_unload_platforms(entry, IMPORT_PLATFORMS):
+            return False
+    await from_wappsto_api.async_stop()
+
     wappstoApi: WappstoIoTApi = hass.data[DOMAIN][entry.entry_id]["to_wappsto"]
     wappstoApi.close()
+    # The certificates are in use until the worker has closed the connection.
+    await hass.async_add_executor_job(wappstoApi.worker.join, 10)
     delete_certificate_files()
+    hass.data[DOMAIN].pop(entry.entry_id)
     return True
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored provisioning manifest and device catalog."""
+    await ProvisionManifest(hass, entry).async_remove()
+    await WappstoApi(hass, entry).async_remove_catalog()
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
     _LOGGER.info("Async_reload_entry")
@@ -4,6 +4,7 @@ from typing import Any
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 from homeassistant import config_entries, exceptions
+from homeassistant.components.sensor import SensorDeviceClass
 from homeassistant.const import (
     CONF_UUID,
     CONF_EMAIL,
@@ -12,6 +13,7 @@ from homeassistant.const import (
 from homeassistant.core import HomeAssistant
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from . import WappstoApi
 from .const import (
@@ -22,6 +24,26 @@ from .const import (
     CA_CRT_KEY,
     CLIENT_CRT_KEY,
     CLIENT_KEY_KEY, SESSION_KEY,
+    REPORT_INTERVAL,
+    DEFAULT_REPORT_INTERVAL,
+    TRANSMIT_MODE,
+    TRANSMIT_MODE_SEQUENTIAL,
+    TRANSMIT_MODE_PIPELINED,
+    DEFAULT_TRANSMIT_MODE,
+    MAX_IN_FLIGHT,
+    DEFAULT_MAX_IN_FLIGHT,
+    WRITE_INTERVAL,
+    DEFAULT_WRITE_INTERVAL,
+    WRITE_TRAILING,
+    DEFAULT_WRITE_TRAILING,
+    SENSOR,
+    VALUE_FILTERS,
+    FILTER_TARGET,
+    FILTER_DELTA,
+    FILTER_DELTA_TYPE,
+    FILTER_PERIOD,
+    DELTA_ABSOLUTE,
+    DELTA_PERCENT,
 )
 from .setup_network import (
     get_session,
@@ -53,17 +75,14 @@ NETWORK_SCHEMA = vol.Schema(
 
 
 async def validate_input(hass: HomeAssistant, data: dict) -> dict[str, str]:
-    session = await hass.async_add_executor_job(
-        get_session,
-        data[CONF_EMAIL],
-        data[CONF_PASSWORD],
-    )
+    client = async_get_clientsession(hass)
+    session = await get_session(client, data[CONF_EMAIL], data[CONF_PASSWORD])
     if not session:
         raise InvalidLogin
 
     _LOGGER.error("WHAT IS SESSION: %s", session)
 
-    creator = await hass.async_add_executor_job(create_network, session)
+    creator = await create_network(client, session)
 
     if not creator:
         raise CouldNotCreate
@@ -72,11 +91,7 @@ async def validate_input(hass: HomeAssistant, data: dict) -> dict[str, str]:
     data[CONF_UUID] = network_uuid
     data[CONF_PASSWORD] = ""
 
-    await hass.async_add_executor_job(
-        claim_network,
-        session,
-        network_uuid,
-    )
+    await claim_network(client, session, network_uuid)
     _LOGGER.warning("Created Network uuid: %s", network_uuid)
 
     saved_files = await hass.async_add_executor_job(
@@ -148,6 +163,12 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         """Initialize the options flow."""
         self.options = dict(config_entry.options)
+        # Paging of the import dialog, selections are kept across pages.
+        self._device_filter = ""
+        self._device_page = 0
+        self._devices_selected: set[str] = set()
+        # Devices on the page last shown, their ticks replace earlier ones.
+        self._devices_shown: set[str] = set()
 
     async def async_step_init(
             self, user_input: dict[str, Any] | None = None
@@ -155,7 +176,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         """Manage the options."""
         return self.async_show_menu(
             step_id="init",
-            menu_options=["import_devices", "export_entities"],
+            menu_options=["import_devices", "export_entities", "settings", "value_filters"],
         )
 
     async def async_step_import_devices(
@@ -165,30 +186,52 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         api: WappstoApi  = self.hass.data[DOMAIN][self.config_entry.entry_id]["from_wappsto"]
 
         if user_input is not None:
-            existing_devices = self.options.get("import_devices", [])
-            newly_selected = user_input.get("devices_to_add", [])
-            self.options["import_devices"] = list(set(existing_devices + newly_selected))
-            return await self._update_options()
+            self._devices_selected -= self._devices_shown
+            self._devices_selected.update(user_input.get("devices_to_add", []))
+            name_filter = user_input.get("name_filter", "")
+            if name_filter != self._device_filter:
+                self._device_filter = name_filter
+                self._device_page = 0
+            elif user_input.get("next_page"):
+                self._device_page += 1
+            else:
+                existing_devices = self.options.get("import_devices", [])
+                self.options["import_devices"] = list(
+                    set(existing_devices) | self._devices_selected
+                )
+                return await self._update_options()
 
-        all_wappsto_devices = await api.get_devices()
+        devices, has_more = await api.list_devices(self._device_filter, self._device_page)
         configured_device_ids = self.options.get("import_devices", [])
 
         discoverable_devices = {
-            dev_id: dev.name
-            for dev_id, dev in all_wappsto_devices.items()
+            dev_id: name
+            for dev_id, name in devices.items()
             if dev_id not in configured_device_ids
         }
 
-        if not discoverable_devices:
+        if (
+            not discoverable_devices
+            and not has_more
+            and not self._device_filter
+            and self._device_page == 0
+        ):
             return self.async_abort(reason="no_new_devices")
 
+        self._devices_shown = set(discoverable_devices)
+        schema = {
+            vol.Optional("name_filter", default=self._device_filter): str,
+            vol.Optional(
+                "devices_to_add",
+                default=[dev_id for dev_id in discoverable_devices if dev_id in self._devices_selected],
+            ): cv.multi_select(discoverable_devices),
+        }
+        if has_more:
+            schema[vol.Optional("next_page", default=False)] = bool
+
         return self.async_show_form(
             step_id="import_devices",
-            data_schema=vol.Schema(
-                {
-                    vol.Optional("devices_to_add"): cv.multi_select(discoverable_devices),
-                }
-            ),
+            data_schema=vol.Schema(schema),
         )
 
     async def async_step_export_entities(
@@ -217,6 +260,85 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             ),
         )
 
+    async def async_step_settings(
+            self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage how reports are sent to Wappsto."""
+        if user_input is not None:
+            self.options.update(user_input)
+            return await self._update_options()
+
+        return self.async_show_form(
+            step_id="settings",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        REPORT_INTERVAL,
+                        default=self.options.get(REPORT_INTERVAL, DEFAULT_REPORT_INTERVAL),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+                    vol.Required(
+                        TRANSMIT_MODE,
+                        default=self.options.get(TRANSMIT_MODE, DEFAULT_TRANSMIT_MODE),
+                    ): vol.In([TRANSMIT_MODE_SEQUENTIAL, TRANSMIT_MODE_PIPELINED]),
+                    vol.Required(
+                        MAX_IN_FLIGHT,
+                        default=self.options.get(MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=64)),
+                    vol.Required(
+                        WRITE_INTERVAL,
+                        default=self.options.get(WRITE_INTERVAL, DEFAULT_WRITE_INTERVAL),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+                    vol.Required(
+                        WRITE_TRAILING,
+                        default=self.options.get(WRITE_TRAILING, DEFAULT_WRITE_TRAILING),
+                    ): bool,
+                }
+            ),
+        )
+
+    async def async_step_value_filters(
+            self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage deadband and minimum period for exported sensors."""
+        value_filters = dict(self.options.get(VALUE_FILTERS, {}))
+
+        if user_input is not None:
+            target = user_input[FILTER_TARGET]
+            if user_input[FILTER_DELTA] == 0 and user_input[FILTER_PERIOD] == 0:
+                value_filters.pop(target, None)
+            else:
+                value_filters[target] = {
+                    FILTER_DELTA: user_input[FILTER_DELTA],
+                    FILTER_DELTA_TYPE: user_input[FILTER_DELTA_TYPE],
+                    FILTER_PERIOD: user_input[FILTER_PERIOD],
+                }
+            self.options[VALUE_FILTERS] = value_filters
+            return await self._update_options()
+
+        targets = sorted(
+            entity_id
+            for entity_id in self.options.get(ENTITY_LIST, [])
+            if entity_id.split(".")[0] == SENSOR
+        ) + [device_class.value for device_class in SensorDeviceClass]
+
+        return self.async_show_form(
+            step_id="value_filters",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(FILTER_TARGET): vol.In(targets),
+                    vol.Required(FILTER_DELTA, default=0): vol.All(
+                        vol.Coerce(float), vol.Range(min=0)
+                    ),
+                    vol.Required(FILTER_DELTA_TYPE, default=DELTA_ABSOLUTE): vol.In(
+                        [DELTA_ABSOLUTE, DELTA_PERCENT]
+                    ),
+                    vol.Required(FILTER_PERIOD, default=0): vol.All(
+                        vol.Coerce(float), vol.Range(min=0, max=86400)
+                    ),
+                }
+            ),
+        )
+
     async def _update_options(self):
         """Update config entry options."""
         return self.async_create_entry(
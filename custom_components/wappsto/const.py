@@ -7,10 +7,50 @@ from homeassistant.const import Platform
 DOMAIN = "wappsto"
 WAPPSTO_HAS_BEEN_SETUP = "wappsto_uniqe_string"
 
+# Platforms of the devices imported from Wappsto.
+IMPORT_PLATFORMS = [Platform.SENSOR, Platform.SWITCH]
+
 DEFAULT_url = "https://wappsto.com"
 
 NETWORK_UUID = "network_uuid"
 ENTITY_LIST = "entities"
+REPORT_INTERVAL = "report_interval"
+DEFAULT_REPORT_INTERVAL = 1.0
+TRANSMIT_MODE = "transmit_mode"
+TRANSMIT_MODE_SEQUENTIAL = "sequential"
+TRANSMIT_MODE_PIPELINED = "pipelined"
+DEFAULT_TRANSMIT_MODE = TRANSMIT_MODE_SEQUENTIAL
+MAX_IN_FLIGHT = "max_in_flight"
+DEFAULT_MAX_IN_FLIGHT = 8
+WRITE_INTERVAL = "write_interval"
+DEFAULT_WRITE_INTERVAL = 0.0
+WRITE_TRAILING = "write_trailing"
+DEFAULT_WRITE_TRAILING = True
+VALUE_FILTERS = "value_filters"
+FILTER_TARGET = "target"
+FILTER_DELTA = "delta"
+FILTER_DELTA_TYPE = "delta_type"
+FILTER_PERIOD = "period"
+DELTA_ABSOLUTE = "absolute"
+DELTA_PERCENT = "percent"
+
+# Concurrent requests to the Wappsto REST API while importing devices.
+MAX_PARALLEL_FETCHES = 8
+NETWORK_PAGE_SIZE = 50
+# Devices per page in the import dialog, and how long a page is reused.
+DEVICE_LIST_PAGE_SIZE = 50
+DEVICE_LIST_TTL = 60
+# Responses larger than this many bytes are decoded in the executor.
+JSON_EXECUTOR_THRESHOLD = 64 * 1024
+# Reconnect delay of the websocket, doubled after each failed attempt.
+WEBSOCKET_BACKOFF_MIN = 1
+WEBSOCKET_BACKOFF_MAX = 300
+# A connection up this long resets the backoff.
+WEBSOCKET_STABLE_AFTER = 60
+# Minimum seconds between two resyncs of the imported Report states.
+WEBSOCKET_RESYNC_INTERVAL = 60
+# Seconds a sent command waits for its report before other reports apply.
+COMMAND_ECHO_TIMEOUT = 10
 # SUPPORTED_MODEL_TYPES = ["2600", "2601"]
 
 NAME = "TEST NAME"
@@ -0,0 +1,22 @@
+"""Diagnostics support for Wappsto."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .from_wappsto.api import WappstoApi
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    from_wappsto_api: WappstoApi = hass.data[DOMAIN][entry.entry_id]["from_wappsto"]
+    return {
+        "options": dict(entry.options),
+        "imported_devices": len(from_wappsto_api.imported_devices),
+        "websocket": from_wappsto_api.websocket_health,
+    }
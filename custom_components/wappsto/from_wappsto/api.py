@@ -1,17 +1,51 @@
 import logging
-import requests
 import json
 import asyncio
+import random
+import re
+import time
+from dataclasses import asdict
+from functools import partial
+from collections.abc import AsyncIterator, Callable
+from typing import Any
 import aiohttp
 import websockets
 import ssl
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-
-from .wappsto_device import WappstoDevice, WappstoValue
+from homeassistant.core import HassJob, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util.json import json_loads
+
+from ..const import (
+    COMMAND_ECHO_TIMEOUT,
+    DEFAULT_WRITE_INTERVAL,
+    DEFAULT_WRITE_TRAILING,
+    DEVICE_LIST_PAGE_SIZE,
+    DEVICE_LIST_TTL,
+    DOMAIN,
+    IMPORT_PLATFORMS,
+    JSON_EXECUTOR_THRESHOLD,
+    MAX_PARALLEL_FETCHES,
+    NETWORK_PAGE_SIZE,
+    WEBSOCKET_BACKOFF_MAX,
+    WEBSOCKET_BACKOFF_MIN,
+    WEBSOCKET_RESYNC_INTERVAL,
+    WEBSOCKET_STABLE_AFTER,
+    WRITE_INTERVAL,
+    WRITE_TRAILING,
+)
+from .wappsto_device import PendingEcho, WappstoDevice, WappstoValue, WappstoValueEntry
 
 _LOGGER = logging.getLogger(__name__)
 
+STORAGE_VERSION = 1
+SAVE_DELAY = 30
+
+# The state id at the end of the path of a frame, found without parsing it.
+_STATE_PATH = re.compile(r'"path"\s*:\s*"[^"]*/state/([^"/]+)"')
+
 
 class WappstoApi:
     """API for fetching devices from Wappsto."""
@@ -21,203 +55,650 @@ class WappstoApi:
         self.hass = hass
         self.entry = entry
         self.session = entry.data["session"]
+        # Home Assistant's shared, pooled session keeps connections alive.
+        self.client = async_get_clientsession(hass)
         self.wappsto_devices: dict[str, WappstoDevice] = {}
-        self._update_callbacks: dict[str, list] = {}
-        self.websocket_task = None
+        # value_id -> device, value and update callbacks of imported values.
+        self._value_index: dict[str, WappstoValueEntry] = {}
+        # Report state id -> value_id, frames are received for state paths.
+        self._state_index: dict[str, str] = {}
+        # value_id -> sent command, until its report comes back or times out.
+        self._pending_echoes: dict[str, PendingEcho] = {}
+        # Each value updates its entities at most once per write interval.
+        self.write_interval = entry.options.get(WRITE_INTERVAL, DEFAULT_WRITE_INTERVAL)
+        self.write_trailing = entry.options.get(WRITE_TRAILING, DEFAULT_WRITE_TRAILING)
+        self.imported_devices: list[str] = list(entry.options.get("import_devices", []))
+        # Paths the websocket should be subscribed to, only Report states.
+        self._subscriptions: set[str] = set()
+        self._has_subscriptions = asyncio.Event()
+        self._websocket = None
+        self._rpc_id = 0
+        self.websocket_task: asyncio.Task | None = None
+        # Health of the websocket: "stopped", "connecting", "connected" or "backoff".
+        self.websocket_state = "stopped"
+        self.websocket_reconnects = 0
+        self.websocket_last_error: str | None = None
+        self._resync_task: asyncio.Task | None = None
+        self._resync_requested = False
+        self._last_resync: float | None = None
+        self._device_fetches: dict[str, asyncio.Future] = {}
+        # Last known imported devices, so entities are created without waiting on Wappsto.
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.catalog")
+        self._catalog: dict[str, WappstoDevice] = {}
+        # Pending save of changed data, device changes use _save_catalog.
+        self._cancel_save: Callable[[], None] | None = None
+        # Catalog devices to refresh once the platforms are set up.
+        self._stale_devices: list[str] = []
+        self._started = False
+        # Serializes unloading and setting up the import platforms.
+        self._platform_lock = asyncio.Lock()
+        # (name filter, page) -> (monotonic time, device names, has more pages)
+        self._device_lists: dict[tuple[str, int], tuple[float, dict[str, str], bool]] = {}
+        self._fetch_limit = asyncio.Semaphore(MAX_PARALLEL_FETCHES)
+        # Separate limit, a device fetch waits for its values while holding a slot.
+        self._value_fetch_limit = asyncio.Semaphore(MAX_PARALLEL_FETCHES)
+
+    async def list_devices(
+        self, name_filter: str = "", page: int = 0
+    ) -> tuple[dict[str, str], bool]:
+        """Return names of a page of devices by ID, and whether more pages exist.
+
+        Only the device list is requested, without values and states, and
+        the name filter is applied by Wappsto.
+        """
+        key = (name_filter, page)
+        cached = self._device_lists.get(key)
+        if cached and time.monotonic() - cached[0] < DEVICE_LIST_TTL:
+            return cached[1], cached[2]
+
+        params = {
+            "expand": 1,
+            "limit": DEVICE_LIST_PAGE_SIZE,
+            "offset": page * DEVICE_LIST_PAGE_SIZE,
+        }
+        if name_filter:
+            # Wappsto matches * as a wildcard in a search filter.
+            params["this_name"] = f"*{name_filter}*"
+        response = await self._get_json("https://wappsto.com/services/2.1/device", params)
+        items = response.get("data", []) if isinstance(response, dict) else response
 
-    async def get_devices(self) -> dict[str, WappstoDevice]:
-        """Fetch Wappsto devices and values."""
-
-        url = "https://wappsto.com/services/2.1/network?expand=2"
-        headers = {"X-session": self.session}
         devices = {}
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as resp:
-                response = await resp.json()
-                for network in response:
-                    for device in network["device"]:
-                        device_id = device["meta"]["id"]
-                        devices[device_id] = WappstoDevice(
-                            wappsto_id=device_id,
-                            name=network["meta"]["name_by_user"] + " - " + device["meta"]["name_by_user"],
-                            values={},
-                        )
-
-        return devices
+        for device in items:
+            meta = device["meta"]
+            network_name = meta.get("parent_name_by_user", {}).get("network", "")
+            devices[meta["id"]] = f"{network_name} - {meta.get('name_by_user') or device.get('name', '')}"
+        has_more = len(items) >= DEVICE_LIST_PAGE_SIZE
+        self._device_lists[key] = (time.monotonic(), devices, has_more)
+        return devices, has_more
 
     async def get_device(self, device_id) -> WappstoDevice:
         """Fetch Wappsto devices and values."""
+        device = await self._load_device(device_id)
+        self.wappsto_devices[device_id] = device
+        self._index_device(device)
+        self._save_catalog()
+        return device
+
+    async def async_load_catalog(self) -> None:
+        """Load the devices imported the last time Home Assistant ran."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        for device_id, device_data in data.get("devices", {}).items():
+            self._catalog[device_id] = WappstoDevice(
+                wappsto_id=device_data["wappsto_id"],
+                name=device_data["name"],
+                values={
+                    value_id: WappstoValue(**value_data)
+                    for value_id, value_data in device_data["values"].items()
+                },
+            )
+
+    async def async_remove_catalog(self) -> None:
+        await self._store.async_remove()
+
+    def _catalog_data(self) -> dict:
+        return {
+            "devices": {
+                device_id: asdict(device)
+                for device_id, device in self.wappsto_devices.items()
+            }
+        }
+
+    def _save_catalog(self) -> None:
+        self._store.async_delay_save(self._catalog_data, SAVE_DELAY)
+
+    def _schedule_save(self) -> None:
+        """Save changed data within SAVE_DELAY.
+
+        Unlike _save_catalog, frequent updates do not postpone the save.
+        """
+        if self._cancel_save is None:
+            self._cancel_save = async_call_later(
+                self.hass, SAVE_DELAY, HassJob(self._save_scheduled)
+            )
+
+    @callback
+    def _save_scheduled(self, _now) -> None:
+        self._cancel_save = None
+        self._store.async_delay_save(self._catalog_data, 0)
+
+    def _index_device(self, device: WappstoDevice) -> None:
+        """Add the values of a device to the value index, keeping callbacks."""
+        paths = set()
+        for value_id, value in device.values.items():
+            if entry := self._value_index.get(value_id):
+                entry.device = device
+                entry.value = value
+            else:
+                self._value_index[value_id] = WappstoValueEntry(device, value)
+            if value.state_read:
+                self._state_index[value.state_read] = value_id
+                paths.add(f"/state/{value.state_read}")
+        self._subscribe(paths)
+
+    def set_imported_devices(self, device_ids: list[str]) -> None:
+        """Forget devices no longer imported and stop listening to them.
+
+        Newly imported devices are subscribed to once they are fetched.
+        """
+        self.imported_devices = list(device_ids)
+        paths = set()
+        for device_id in set(self.wappsto_devices) - set(device_ids):
+            device = self.wappsto_devices.pop(device_id)
+            self._device_fetches.pop(device_id, None)
+            for value_id, value in device.values.items():
+                self._value_index.pop(value_id, None)
+                if value.state_read:
+                    self._state_index.pop(value.state_read, None)
+                    paths.add(f"/state/{value.state_read}")
+        self._unsubscribe(paths)
+        self._save_catalog()
+
+    async def async_update_imported_devices(self, device_ids: list[str]) -> None:
+        """Change the imported devices, reloading only the import platforms."""
+        async with self._platform_lock:
+            if device_ids == self.imported_devices:
+                return
+            if self.imported_devices:
+                await self.hass.config_entries.async_unload_platforms(
+                    self.entry, IMPORT_PLATFORMS
+                )
+            self.set_imported_devices(device_ids)
+            if device_ids:
+                await self.hass.config_entries.async_forward_entry_setups(
+                    self.entry, IMPORT_PLATFORMS
+                )
+
+    async def _async_reload_platforms(self) -> None:
+        async with self._platform_lock:
+            if not self.imported_devices:
+                return
+            await self.hass.config_entries.async_unload_platforms(
+                self.entry, IMPORT_PLATFORMS
+            )
+            await self.hass.config_entries.async_forward_entry_setups(
+                self.entry, IMPORT_PLATFORMS
+            )
+
+    def _subscribe(self, paths: set[str]) -> None:
+        paths = paths - self._subscriptions
+        if not paths:
+            return
+        self._subscriptions |= paths
+        self._has_subscriptions.set()
+        if self._websocket is not None:
+            self.hass.async_create_task(self._send_subscriptions("POST", paths))
+
+    def _unsubscribe(self, paths: set[str]) -> None:
+        paths = paths & self._subscriptions
+        if not paths:
+            return
+        self._subscriptions -= paths
+        if self._websocket is not None:
+            self.hass.async_create_task(self._send_subscriptions("DELETE", paths))
+
+    async def _send_subscriptions(self, method: str, paths: set[str]) -> None:
+        """Change the subscriptions of the open websocket, without reconnecting."""
+        websocket = self._websocket
+        if websocket is None:
+            return
+        _LOGGER.debug("Websocket subscription %s: %s", method, paths)
+        try:
+            for path in paths:
+                # Skip paths changed again while earlier ones were sent.
+                if (path in self._subscriptions) != (method == "POST"):
+                    continue
+                self._rpc_id += 1
+                await websocket.send(json.dumps({
+                    "jsonrpc": "2.0",
+                    "method": method,
+                    "id": self._rpc_id,
+                    "params": {
+                        "url": "/services/2.1/websocket/open/subscription",
+                        "data": path,
+                    },
+                }))
+        except websockets.exceptions.ConnectionClosed:
+            # The next connection is opened with the current subscriptions.
+            pass
+
+    async def _load_device(self, device_id) -> WappstoDevice:
+        """Fetch a Wappsto device and its values, without keeping it."""
 
         url = f"https://wappsto.com/services/2.1/device/{device_id}?expand=2"
         headers = {"X-session": self.session}
 
-        async with aiohttp.ClientSession() as session:
-            _LOGGER.warning("Fetching Wappsto Device: " + device_id + "")
-            async with session.get(url, headers=headers) as resp:
-                device_data = await resp.json()
-                device = WappstoDevice(
-                    wappsto_id=device_id,
-                    name=device_data["meta"]["parent_name_by_user"]["network"] + " - " + device_data["meta"]["name_by_user"],
-                    values={},
-                )
+        _LOGGER.warning("Fetching Wappsto Device: " + device_id + "")
+        async with self.client.get(url, headers=headers) as resp:
+            # Values are parsed with the decode, off the loop for large devices.
+            (device, value_ids) = await self._read_json(
+                resp, partial(_parse_device, device_id)
+            )
 
-                for value_data in device_data.get("value", []):
-                    if isinstance(value_data, str):
-                        _LOGGER.warning("Value ID was a string: %s, had to fetch value", value_data)
-                        value_id = value_data
-                        url = f"https://wappsto.com/services/2.1/value/{value_id}?expand=2"
-                        headers = {"X-session": self.session}
-                        response = await session.get(url, headers=headers)
-                        value_data = await response.json()
-                    else:
-                        value_id = value_data["meta"]["id"]
-
-                    if value_data is None or "meta" not in value_data or "id" not in value_data["meta"]:
-                        raise ValueError("Value has no ID: " + json.dumps(value_data))
-
-                    state_read = None
-                    state_write = None
-                    report_data = ""
-                    for state_data in value_data.get("state", []):
-                        if state_data.get("type") == "Report":
-                            report_data = state_data.get("data", "")
-                            state_read = state_data.get("meta", {}).get("id")
-                        elif state_data.get("type") == "Control":
-                            state_write = state_data.get("meta", {}).get("id")
-
-                    value = WappstoValue(
-                        wappsto_id=value_id,
-                        name=value_data["name"],
-                        type=value_data["type"],
-                        permission=value_data["permission"],
-                        data=report_data,
-                        unit=value_data.get("number", {}).get("unit"),
-                        state_read=state_read,
-                        state_write=state_write,
-                    )
-                    device.values[value_id] = value
-
-                self.wappsto_devices[device_id] = device
-                return device
-
-    def get_devices_deep(self) -> dict[str, WappstoDevice]:
-        """Fetch Wappsto devices and values."""
+        if value_ids:
+            _LOGGER.warning("Value IDs were strings: %s, had to fetch values", value_ids)
+            fetched = await asyncio.gather(*(self._fetch_value(value_id) for value_id in value_ids))
+            for value_id, value_data in zip(value_ids, fetched):
+                device.values[value_id] = _parse_value(value_data)
 
-        _LOGGER.warning("Fetching Wappsto devices")
+        return device
 
-        url = "https://wappsto.com/services/2.1/network?expand=0"
+    async def _fetch_value(self, value_id: str) -> dict | None:
+        """Fetch a value that was only referenced by its ID."""
+        url = f"https://wappsto.com/services/2.1/value/{value_id}?expand=2"
         headers = {"X-session": self.session}
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        networks = response.json()
-
-        for network in networks:
-            network_id = network["meta"]["id"]
-            _LOGGER.warning("Fetching Wappsto network: " + network_id + "")
-
-            url = f"https://wappsto.com/services/2.1/network/{network_id}?expand=10"
-            headers = {"X-session": self.session}
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            network = response.json()
-
-            for device_data in network.get("device", []):
-                device_id = device_data["meta"]["id"]
-                device = WappstoDevice(
-                    wappsto_id=device_id,
-                    name=device_data["name"],
-                    values={},
-                )
-                self.wappsto_devices[device_id] = device
-
-                _LOGGER.warning("Fetching Wappsto device: " + device_id + "")
-                url = f"https://wappsto.com/services/2.1/device/{device_id}?expand=10"
-                headers = {"X-session": self.session}
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                device_data = response.json()
-
-                for value_data in device_data.get("value", []):
-                    if isinstance(value_data, str):
-                        _LOGGER.warning("Value ID was a string: %s, had to fetch value", value_data)
-                        value_id = value_data
-                        url = f"https://wappsto.com/services/2.1/value/{value_id}?expand=10"
-                        headers = {"X-session": self.session}
-                        response = requests.get(url, headers=headers)
-                        response.raise_for_status()
-                        value_data = response.json()
-                    else:
-                        value_id = value_data["meta"]["id"]
-
-                    if value_data is None or "meta" not in value_data or "id" not in value_data["meta"]:
-                        raise ValueError(
-                            "Value has no ID: " + json.dumps(value_data) + " in network " + json.dumps(network))
-
-                    data = ""
-                    for state_data in value_data.get("state", []):
-                        if value_data["type"] == "Report":
-                            data = state_data["data"]
-                            break
-
-                    value = WappstoValue(
-                        wappsto_id=value_id,
-                        name=value_data["name"],
-                        type=value_data["type"],
-                        permission=value_data["permission"],
-                        data=data,
-                        unit=value_data.get("number", {}).get("unit"),
-                    )
-                    device.values[value_id] = value
-
-        _LOGGER.warning("Done fetching Wappsto devices")
-
-        return self.wappsto_devices
+        async with self._value_fetch_limit:
+            async with self.client.get(url, headers=headers) as resp:
+                return await self._read_json(resp)
+
+    async def get_imported_devices(self, device_ids: list[str]) -> list[WappstoDevice]:
+        """Fetch the given devices concurrently, sharing each download."""
+        return await asyncio.gather(
+            *(self._fetch_device(device_id) for device_id in device_ids)
+        )
+
+    def _fetch_device(self, device_id: str) -> asyncio.Future:
+        """Return the fetch of a device, starting it if not already done."""
+        if (task := self._device_fetches.get(device_id)) is None:
+            if device_id in self._catalog:
+                task = self.hass.async_create_task(self._device_from_catalog(device_id))
+            else:
+                task = self.hass.async_create_task(self._fetch_device_limited(device_id))
+            self._device_fetches[device_id] = task
+            task.add_done_callback(partial(self._forget_failed_fetch, device_id))
+        return task
+
+    @callback
+    def _forget_failed_fetch(self, device_id: str, task: asyncio.Task) -> None:
+        """Drop a failed fetch, so the device is fetched again next time."""
+        if (task.cancelled() or task.exception() is not None) and (
+            self._device_fetches.get(device_id) is task
+        ):
+            del self._device_fetches[device_id]
+
+    async def _device_from_catalog(self, device_id: str) -> WappstoDevice:
+        """Use the stored device now, and refresh it from Wappsto in the background."""
+        device = self._catalog.pop(device_id)
+        self.wappsto_devices[device_id] = device
+        self._index_device(device)
+        if self._started:
+            self._start_refresh(device_id)
+        else:
+            # A changed device reloads the platforms, not while they are set up.
+            self._stale_devices.append(device_id)
+        return device
+
+    def _start_refresh(self, device_id: str) -> None:
+        self.entry.async_create_background_task(
+            self.hass, self._refresh_device(device_id), f"{DOMAIN} refresh {device_id}"
+        )
+
+    def _replace_device(self, device_id: str, fresh: WappstoDevice) -> None:
+        """Swap in a changed device, forgetting values and states it no longer has."""
+        old = self.wappsto_devices[device_id]
+        paths = set()
+        for value_id, value in old.values.items():
+            fresh_value = fresh.values.get(value_id)
+            if fresh_value is None:
+                self._value_index.pop(value_id, None)
+            if value.state_read and (
+                fresh_value is None or fresh_value.state_read != value.state_read
+            ):
+                self._state_index.pop(value.state_read, None)
+                paths.add(f"/state/{value.state_read}")
+        self._unsubscribe(paths)
+        self.wappsto_devices[device_id] = fresh
+        self._index_device(fresh)
+        # Platforms set up again get the fresh device.
+        fetched = self.hass.loop.create_future()
+        fetched.set_result(fresh)
+        self._device_fetches[device_id] = fetched
+        self._save_catalog()
+
+    async def _refresh_device(self, device_id: str) -> None:
+        """Reconcile a device created from the catalog with Wappsto."""
+        try:
+            async with self._fetch_limit:
+                fresh = await self._load_device(device_id)
+        except Exception as err:
+            _LOGGER.warning("Could not refresh Wappsto device %s: %s", device_id, err)
+            return
+        device = self.wappsto_devices.get(device_id)
+        if device is None:
+            return
+        if device.name != fresh.name or {
+            value_id: _definition(value) for value_id, value in device.values.items()
+        } != {
+            value_id: _definition(value) for value_id, value in fresh.values.items()
+        }:
+            # Values were added, removed or changed, so are the entities.
+            _LOGGER.info("Wappsto device %s has changed, reloading its platforms", device_id)
+            self._replace_device(device_id, fresh)
+            await self._async_reload_platforms()
+            return
+        for value_id, value in fresh.values.items():
+            current = device.values[value_id].timestamp
+            if current and value.timestamp and value.timestamp <= current:
+                continue
+            self._on_wappsto_update(value_id, value.data, value.timestamp)
+        self._schedule_save()
+
+    async def _fetch_device_limited(self, device_id: str) -> WappstoDevice:
+        async with self._fetch_limit:
+            return await self.get_device(device_id)
+
+    async def crawl_devices(
+        self, limit: int = MAX_PARALLEL_FETCHES, page_size: int = NETWORK_PAGE_SIZE
+    ) -> AsyncIterator[WappstoDevice]:
+        """Yield every Wappsto device on the account.
+
+        Networks are listed a page at a time, and the networks and devices of
+        a page are fetched concurrently with at most `limit` requests running.
+        Devices are yielded as they arrive and are not kept by the API.
+        """
+        semaphore = asyncio.Semaphore(limit)
+        offset = 0
+        while True:
+            url = f"https://wappsto.com/services/2.1/network?expand=0&limit={page_size}&offset={offset}"
+            async with semaphore:
+                page = await self._get_json(url)
+            network_ids = _id_list(page)
+            _LOGGER.debug("Crawling %s Wappsto networks from %s", len(network_ids), offset)
+
+            async def fetch_device_ids(network_id: str) -> list[str]:
+                url = f"https://wappsto.com/services/2.1/network/{network_id}?expand=0"
+                async with semaphore:
+                    network = await self._get_json(url)
+                return _id_list(network.get("device", []))
+
+            async def fetch_device(device_id: str) -> WappstoDevice:
+                async with semaphore:
+                    return await self._load_device(device_id)
+
+            for device_ids in asyncio.as_completed(
+                [fetch_device_ids(network_id) for network_id in network_ids]
+            ):
+                for device in asyncio.as_completed(
+                    [fetch_device(device_id) for device_id in await device_ids]
+                ):
+                    yield await device
+
+            if len(network_ids) < page_size:
+                return
+            offset += page_size
+
+    async def _get_json(self, url: str, params: dict[str, Any] | None = None) -> Any:
+        headers = {"X-session": self.session}
+        async with self.client.get(url, headers=headers, params=params) as resp:
+            resp.raise_for_status()
+            return await self._read_json(resp)
+
+    async def _read_json(
+        self, resp: aiohttp.ClientResponse, convert: Callable[[Any], Any] | None = None
+    ) -> Any:
+        """Decode a response, and convert it, with large bodies off the event loop."""
+        body = await resp.read()
+        if len(body) > JSON_EXECUTOR_THRESHOLD:
+            return await self.hass.async_add_executor_job(_decode, body, convert)
+        return _decode(body, convert)
+
+    def start(self) -> None:
+        """Start the one websocket task of this entry."""
+        if self.websocket_task is not None and not self.websocket_task.done():
+            return
+        self._started = True
+        for device_id in self._stale_devices:
+            self._start_refresh(device_id)
+        self._stale_devices.clear()
+        self.websocket_task = self.entry.async_create_background_task(
+            self.hass,
+            self.start_websocket(),
+            f"{DOMAIN} websocket {self.entry.entry_id}",
+        )
+
+    async def async_stop(self) -> None:
+        """Cancel the websocket task and wait for the socket to close."""
+        task, self.websocket_task = self.websocket_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.websocket_state = "stopped"
+        for pending in self._pending_echoes.values():
+            pending.cancel_timeout()
+        self._pending_echoes.clear()
+        if self._cancel_save is not None:
+            self._cancel_save()
+            self._save_scheduled(None)
+        for entry in self._value_index.values():
+            if entry.cancel_flush is not None:
+                entry.cancel_flush()
+                entry.cancel_flush = None
+
+    @property
+    def websocket_health(self) -> dict[str, Any]:
+        """Return the health of the websocket connection."""
+        return {
+            "state": self.websocket_state,
+            "reconnects": self.websocket_reconnects,
+            "last_error": self.websocket_last_error,
+            "subscriptions": len(self._subscriptions),
+        }
 
     async def start_websocket(self):
         """Start the WebSocket connection."""
-        url = f"wss://wappsto.com/services/2.1/websocket/open?X-Session={self.session}&subscription=[/network]"
         ssl_context = await self.hass.async_add_executor_job(ssl.create_default_context)
+        attempts = 0
+        connected_before = False
         while True:
+            connected_at = None
+            # Nothing to listen to until an imported device has been fetched.
+            await self._has_subscriptions.wait()
+            self.websocket_state = "connecting"
+            # Subscriptions are sent after connecting, a query string with
+            # every state path would outgrow URL limits on large imports.
+            url = (
+                f"wss://wappsto.com/services/2.1/websocket/open?X-Session={self.session}"
+                "&subscription=[]"
+            )
             try:
                 async with websockets.connect(url, ssl=ssl_context) as websocket:
                     _LOGGER.info("Connected to Wappsto WebSocket")
+                    self._websocket = websocket
+                    self.websocket_state = "connected"
+                    connected_at = time.monotonic()
+                    await self._send_subscriptions("POST", set(self._subscriptions))
+                    if connected_before:
+                        self.websocket_reconnects += 1
+                        # Updates sent while disconnected were missed, the
+                        # ones sent from now on arrive on the new socket.
+                        self._request_resync()
+                    connected_before = True
                     while True:
                         message = await websocket.recv()
-                        data = json.loads(message)
-                        if data.get("event") == "update" and data.get("data"):
-                            if data["data"].get("data") is None:
-                                continue
-
-                            new_data = data["data"]["data"]
-                            # /network/<network-id>/device/<device-id>/value/<value-id>/state/<state-id>
-                            value_id = data["path"].split("/")[6]
-                            self._on_wappsto_update(value_id, new_data)
-            except (websockets.exceptions.ConnectionClosedError, asyncio.TimeoutError):
-                _LOGGER.warning("Wappsto WebSocket connection lost. Reconnecting in 10 seconds.")
-                await asyncio.sleep(10)
-
-    def _on_wappsto_update(self, value_id, data):
+                        if update := self._decode_update(message):
+                            self._on_wappsto_update(*update)
+            except (websockets.exceptions.ConnectionClosed, asyncio.TimeoutError, OSError) as err:
+                _LOGGER.warning("Wappsto WebSocket connection lost: %s", err)
+                self.websocket_last_error = str(err)
+            except Exception as err:
+                _LOGGER.exception("Unexpected error in Wappsto WebSocket")
+                self.websocket_last_error = repr(err)
+            finally:
+                self._websocket = None
+            self.websocket_state = "backoff"
+            # A socket accepted and then dropped right away still backs off.
+            if connected_at is not None and time.monotonic() - connected_at >= WEBSOCKET_STABLE_AFTER:
+                attempts = 0
+            # Exponential backoff with full jitter, so clients do not reconnect in step.
+            delay = random.uniform(
+                0, min(WEBSOCKET_BACKOFF_MAX, WEBSOCKET_BACKOFF_MIN * 2**attempts)
+            )
+            attempts += 1
+            _LOGGER.warning("Reconnecting to Wappsto WebSocket in %.1f seconds", delay)
+            await asyncio.sleep(delay)
+
+    def _request_resync(self) -> None:
+        """Resync once, at most every WEBSOCKET_RESYNC_INTERVAL seconds."""
+        self._resync_requested = True
+        if self._resync_task is None or self._resync_task.done():
+            self._resync_task = self.entry.async_create_background_task(
+                self.hass, self._resync_when_due(), f"{DOMAIN} resync"
+            )
+
+    async def _resync_when_due(self) -> None:
+        # Reconnects while waiting or resyncing are covered by one more pass.
+        while self._resync_requested:
+            if self._last_resync is not None:
+                wait = self._last_resync + WEBSOCKET_RESYNC_INTERVAL - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            self._resync_requested = False
+            self._last_resync = time.monotonic()
+            await self._resync_reports()
+
+    async def _resync_reports(self) -> None:
+        """Fetch the Report state of every imported value, and apply newer ones."""
+        entries = [
+            entry for entry in self._value_index.values() if entry.value.state_read
+        ]
+        _LOGGER.debug("Resyncing %s Wappsto reports", len(entries))
+
+        async def resync(entry: WappstoValueEntry) -> None:
+            url = f"https://wappsto.com/services/2.1/state/{entry.value.state_read}"
+            try:
+                async with self._value_fetch_limit:
+                    state = await self._get_json(url)
+            except Exception as err:
+                _LOGGER.warning("Could not resync %s: %s", entry.value.wappsto_id, err)
+                return
+            timestamp = state.get("timestamp")
+            if timestamp and entry.value.timestamp and timestamp <= entry.value.timestamp:
+                return
+            if state.get("data") is not None:
+                self._on_wappsto_update(entry.value.wappsto_id, state["data"], timestamp)
+
+        await asyncio.gather(*(resync(entry) for entry in entries))
+
+    def _decode_update(self, message: str | bytes) -> tuple[str, Any, str | None] | None:
+        """Return value_id, data and timestamp of an update for an imported value.
+
+        Frames of other events or unknown states are dropped by cheap string
+        checks, only the relevant ones are fully parsed.
+        """
+        if isinstance(message, bytes):
+            message = message.decode()
+        if '"update"' not in message:
+            return None
+        match = _STATE_PATH.search(message)
+        if match is None or (value_id := self._state_index.get(match[1])) is None:
+            return None
+        data = json_loads(message)
+        if not isinstance(data, dict) or data.get("event") != "update":
+            return None
+        state = data.get("data")
+        if not isinstance(state, dict) or state.get("data") is None:
+            return None
+        return value_id, state["data"], state.get("timestamp")
+
+    def _on_wappsto_update(self, value_id, data, timestamp=None):
         """Handle update from Wappsto."""
         _LOGGER.warning("Received update for %s: %s", value_id, data)
-        for device in self.wappsto_devices.values():
-            if value := device.get_value(value_id):
-                value.data = data
-                if value_id in self._update_callbacks:
-                    for callback in self._update_callbacks[value_id]:
-                        callback()
-                break
-
-    def register_update_callback(self, value_id: str, callback) -> None:
-        """Register a callback for value updates."""
-        if value_id not in self._update_callbacks:
-            self._update_callbacks[value_id] = []
-        self._update_callbacks[value_id].append(callback)
+        if pending := self._pending_echoes.get(value_id):
+            if data != pending.data:
+                # Possibly reported before the command took effect, it is
+                # held back until the echo arrives or the command times out.
+                pending.held = (data, timestamp)
+                return
+            pending.cancel_timeout()
+            del self._pending_echoes[value_id]
+        self._apply_update(value_id, data, timestamp)
+
+    @callback
+    def _echo_timeout(self, value_id: str, _now) -> None:
+        """Apply the report held back for a command that was never echoed."""
+        pending = self._pending_echoes.pop(value_id, None)
+        if pending is not None and pending.held is not None:
+            self._apply_update(value_id, *pending.held)
+
+    def _apply_update(self, value_id, data, timestamp=None) -> None:
+        entry = self._value_index.get(value_id)
+        if entry is None:
+            return
+        if timestamp:
+            entry.value.timestamp = timestamp
+        if data == entry.value.data:
+            return
+        entry.value.data = data
+        self._schedule_save()
+        self._dispatch(entry)
+
+    def _dispatch(self, entry: WappstoValueEntry) -> None:
+        """Call the callbacks of a value, throttled to the write interval.
+
+        Callbacks read the value when called, so a trailing flush writes the
+        latest data received during the interval.
+        """
+        if self.write_interval <= 0:
+            self._call_callbacks(entry)
+            return
+        if entry.cancel_flush is not None:
+            return
+        wait = entry.last_dispatch + self.write_interval - time.monotonic()
+        if wait <= 0:
+            self._call_callbacks(entry)
+        elif self.write_trailing:
+            entry.cancel_flush = async_call_later(
+                self.hass, wait, HassJob(partial(self._flush, entry))
+            )
+
+    @callback
+    def _flush(self, entry: WappstoValueEntry, _now) -> None:
+        entry.cancel_flush = None
+        self._call_callbacks(entry)
+
+    def _call_callbacks(self, entry: WappstoValueEntry) -> None:
+        entry.last_dispatch = time.monotonic()
+        for update_callback in list(entry.callbacks):
+            update_callback()
+
+    def register_update_callback(
+        self, value_id: str, callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Register a callback for value updates, return a function removing it."""
+        entry = self._value_index.get(value_id)
+        if entry is None:
+            return lambda: None
+        entry.callbacks.add(callback)
+        return lambda: entry.callbacks.discard(callback)
 
     def unregister_update_callback(self, value_id: str, callback) -> None:
         """Unregister a callback for value updates."""
-        if value_id in self._update_callbacks and callback in self._update_callbacks[value_id]:
-            self._update_callbacks[value_id].remove(callback)
+        if entry := self._value_index.get(value_id):
+            entry.callbacks.discard(callback)
 
     async def send_command(self, value: WappstoValue, data: str) -> None:
         """Send a command to a Wappsto device."""
@@ -225,14 +706,95 @@ class WappstoApi:
         headers = {"X-session": self.session, "Content-Type": "application/json"}
         payload = {"data": data}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.patch(url, headers=headers, json=payload) as resp:
-                resp.raise_for_status()
-
-                if resp.status == 200:
-                    _LOGGER.warning("Command sent successfully to %s", value.wappsto_id)
-                    self._on_wappsto_update(value.wappsto_id, data)
-                else:
-                    _LOGGER.error(
-                        "Failed to send command to %s: %s", value.wappsto_id, await resp.text()
-                    )
+        async with self.client.patch(url, headers=headers, json=payload) as resp:
+            resp.raise_for_status()
+
+            if resp.status == 200:
+                _LOGGER.warning("Command sent successfully to %s", value.wappsto_id)
+                if pending := self._pending_echoes.get(value.wappsto_id):
+                    pending.cancel_timeout()
+                self._pending_echoes[value.wappsto_id] = PendingEcho(
+                    data,
+                    async_call_later(
+                        self.hass,
+                        COMMAND_ECHO_TIMEOUT,
+                        HassJob(partial(self._echo_timeout, value.wappsto_id)),
+                    ),
+                )
+                self._apply_update(value.wappsto_id, data)
+            else:
+                _LOGGER.error(
+                    "Failed to send command to %s: %s", value.wappsto_id, await resp.text()
+                )
+
+
+def _decode(body: bytes, convert: Callable[[Any], Any] | None = None) -> Any:
+    data = json_loads(body)
+    return convert(data) if convert else data
+
+
+def _parse_device(device_id: str, device_data: dict) -> tuple[WappstoDevice, list[str]]:
+    """Return a device with its expanded values, and the IDs of the others."""
+    device = WappstoDevice(
+        wappsto_id=device_id,
+        name=device_data["meta"]["parent_name_by_user"]["network"] + " - " + device_data["meta"]["name_by_user"],
+        values={},
+    )
+    value_ids = []
+    for value_data in device_data.get("value", []):
+        if isinstance(value_data, str):
+            # Keeps its place in the values until it is fetched.
+            value_ids.append(value_data)
+            device.values[value_data] = None
+            continue
+        value = _parse_value(value_data)
+        device.values[value.wappsto_id] = value
+    return device, value_ids
+
+
+def _parse_value(value_data: dict | None) -> WappstoValue:
+    if value_data is None or "meta" not in value_data or "id" not in value_data["meta"]:
+        raise ValueError("Value has no ID: " + json.dumps(value_data))
+
+    state_read = None
+    state_write = None
+    report_data = ""
+    timestamp = None
+    for state_data in value_data.get("state", []):
+        if state_data.get("type") == "Report":
+            report_data = state_data.get("data", "")
+            timestamp = state_data.get("timestamp")
+            state_read = state_data.get("meta", {}).get("id")
+        elif state_data.get("type") == "Control":
+            state_write = state_data.get("meta", {}).get("id")
+
+    return WappstoValue(
+        wappsto_id=value_data["meta"]["id"],
+        name=value_data["name"],
+        type=value_data["type"],
+        permission=value_data["permission"],
+        data=report_data,
+        unit=value_data.get("number", {}).get("unit"),
+        state_read=state_read,
+        state_write=state_write,
+        timestamp=timestamp,
+    )
+
+
+def _definition(value: WappstoValue) -> tuple:
+    """Return what makes up the entity of a value, all but its data."""
+    return (
+        value.name,
+        value.type,
+        value.permission,
+        value.unit,
+        value.state_read,
+        value.state_write,
+    )
+
+
+def _id_list(data: Any) -> list[str]:
+    """Return the IDs of a Wappsto list, whether expanded or not."""
+    if isinstance(data, dict):
+        data = data.get("id", [])
+    return [item if isinstance(item, str) else item["meta"]["id"] for item in data]
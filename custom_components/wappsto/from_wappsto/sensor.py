@@ -52,9 +52,8 @@ async def async_setup_entry(
 
     sensors = []
 
-    for device_id in entry.options["import_devices"]:
-        device = await wappsto_api.get_device(device_id)
-
+    devices = await wappsto_api.get_imported_devices(entry.options["import_devices"])
+    for device in devices:
         for value in device.values.values():
             if value.type in WAPPSTO_VALUE_TYPE_TO_DEVICE_CLASS:
                 sensors.append(WappstoSensor(wappsto_api, device, value))
@@ -100,12 +99,8 @@ class WappstoSensor(SensorEntity):
 
     async def async_added_to_hass(self) -> None:
         """Register callbacks."""
-
-        def _update_callback():
-            self.async_write_ha_state()
-
-        self._wappsto_api.register_update_callback(self._value.wappsto_id, _update_callback)
-
-    async def async_will_remove_from_hass(self) -> None:
-        """Unregister callbacks."""
-        self._wappsto_api.unregister_update_callback(self._value.wappsto_id, lambda: self.async_write_ha_state())
+        self.async_on_remove(
+            self._wappsto_api.register_update_callback(
+                self._value.wappsto_id, self.async_write_ha_state
+            )
+        )
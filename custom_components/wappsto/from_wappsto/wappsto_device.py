@@ -1,7 +1,8 @@
 """Represents a Wappsto device."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Callable
 
 
 @dataclass
@@ -16,6 +17,8 @@ class WappstoValue:
     unit: str | None = None
     state_read: str | None = None
     state_write: str | None = None
+    # Timestamp of the last seen Report, to only apply newer ones.
+    timestamp: str | None = None
 
 
 @dataclass
@@ -29,3 +32,25 @@ class WappstoDevice:
     def get_value(self, value_id: str) -> WappstoValue | None:
         """Return the value with the given ID."""
         return self.values.get(value_id)
+
+
+@dataclass(slots=True)
+class WappstoValueEntry:
+    """Index entry of an imported value, with its device and callbacks."""
+
+    device: WappstoDevice
+    value: WappstoValue
+    callbacks: set[Callable[[], None]] = field(default_factory=set)
+    # Monotonic time the callbacks were last called, and a scheduled flush.
+    last_dispatch: float = 0.0
+    cancel_flush: Callable[[], None] | None = None
+
+
+@dataclass(slots=True)
+class PendingEcho:
+    """A sent command waiting for its report to come back."""
+
+    data: str
+    cancel_timeout: Callable[[], None]
+    # Latest (data, timestamp) reported meanwhile, applied if no echo comes.
+    held: tuple[str, str | None] | None = None
@@ -2,7 +2,7 @@ import json
 import logging
 from pathlib import Path
 
-import requests
+import aiohttp
 
 from .const import (
     CA_CRT_KEY,
@@ -13,50 +13,47 @@ from .const import (
 _LOGGER = logging.getLogger(__name__)
 
 
-def get_session(username, password):
+async def get_session(client: aiohttp.ClientSession, username, password):
     session_json = {"username": username, "password": password, "remember_me": True}
 
     url = f"https://wappsto.com/services/session"
     headers = {"Content-type": "application/json"}
     data = json.dumps(session_json)
 
-    rdata = requests.post(url=url, headers=headers, data=data)
+    async with client.post(url, headers=headers, data=data) as rdata:
+        if rdata.status >= 300:
+            _LOGGER.error("An error occurred during login")
+            return None
 
-    if rdata.status_code >= 300:
-        _LOGGER.error("An error occurred during login")
-        return None
-
-    rjson = json.loads(rdata.text)
+        rjson = json.loads(await rdata.text())
     _LOGGER.info(rjson)
     return rjson["meta"]["id"]
 
 
-def create_network(session):
+async def create_network(client: aiohttp.ClientSession, session):
     request = {}
 
     url = f"https://wappsto.com/services/2.1/creator"
     headers = {"Content-type": "application/json", "X-session": str(session)}
     data = json.dumps(request)
-    rdata = requests.post(url=url, headers=headers, data=data)
-
-    if rdata.status_code >= 300:
-        _LOGGER.error("An error occurred during Certificate retrieval")
-        return None
-    rjson = json.loads(rdata.text)
+    async with client.post(url, headers=headers, data=data) as rdata:
+        if rdata.status >= 300:
+            _LOGGER.error("An error occurred during Certificate retrieval")
+            return None
+        rjson = json.loads(await rdata.text())
     _LOGGER.info("Certificate generated for new network")
     return rjson
 
 
-def claim_network(session, network_uuid, dry_run=False):
+async def claim_network(client: aiohttp.ClientSession, session, network_uuid, dry_run=False):
     url = f"https://wappsto.com/services/2.0/network/{network_uuid}"
     headers = {"Content-type": "application/json", "X-session": str(session)}
-    rdata = requests.post(url=url, headers=headers, data="{}")
-
-    if rdata.status_code >= 300:
-        _LOGGER.error("An error occurred during claiming the network")
-        return None
+    async with client.post(url, headers=headers, data="{}") as rdata:
+        if rdata.status >= 300:
+            _LOGGER.error("An error occurred during claiming the network")
+            return None
 
-    rjson = json.loads(rdata.text)
+        rjson = json.loads(await rdata.text())
     _LOGGER.info("Network: %s have been claimed", network_uuid)
     return rjson
 
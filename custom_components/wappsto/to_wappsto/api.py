@@ -1,21 +1,22 @@
 import logging
 import wappstoiot
+from concurrent.futures import Future
 from pathlib import Path
 
 from wappstoiot import Device
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
-    EVENT_STATE_CHANGED,
     EVENT_HOMEASSISTANT_STARTED,
     EVENT_HOMEASSISTANT_STOP,
     EVENT_SERVICE_REGISTERED,
 )
-from homeassistant.core import Event, HomeAssistant
+from homeassistant.core import CoreState, Event, HomeAssistant, callback
 
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.entity import async_generate_entity_id, DeviceInfo
 from homeassistant.helpers.entity_component import EntityComponent
+from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers import (
     device_registry as dr,
@@ -36,6 +37,14 @@ from ..const import (
     SWITCH,
     BUTTON,
     DEVICE_TRACKER, SESSION_KEY, ENTITY_LIST,
+    REPORT_INTERVAL,
+    DEFAULT_REPORT_INTERVAL,
+    TRANSMIT_MODE,
+    TRANSMIT_MODE_PIPELINED,
+    DEFAULT_TRANSMIT_MODE,
+    MAX_IN_FLIGHT,
+    DEFAULT_MAX_IN_FLIGHT,
+    VALUE_FILTERS,
 )
 from ..binary_sensor import wappsto_connected_sensor
 from .handle_input import HandleInput
@@ -45,26 +54,61 @@ from .handle_sensor import HandleSensor
 from .handle_switch import HandleSwitch
 from .handle_button import HandleButton
 from .handle_device_tracker import HandleDeviceTracker
+from .handler import Route
+from .report_queue import ReportQueue
+from .manifest import ManifestConnection, ProvisionManifest
+from .worker import WappstoWorker
 
 
 class WappstoIoTApi:
     entity_list: list = []
     session: str = ""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+    def __init__(
+        self, hass: HomeAssistant, entry: ConfigEntry, manifest: ProvisionManifest
+    ) -> None:
         _LOGGER.info("TESTING WAPPSTO API __INIT__")
         self.hass = hass
+        self.manifest = manifest
         self.entity_list = entry.options[ENTITY_LIST]
+        self.options = dict(entry.options)
         self.session = entry.data[SESSION_KEY]
         self.valueList = {}
         self.deviceList = {}
-        self.handle_input = HandleInput(self.hass)
-        self.handle_binary_sensor = HandleBinarySensor(self.hass)
-        self.handle_sensor = HandleSensor(self.hass)
-        self.handle_switch = HandleSwitch(self.hass)
-        self.handle_button = HandleButton(self.hass)
-        self.handle_light = HandleLight(self.hass)
-        self.handle_device_tracker = HandleDeviceTracker(self.hass)
+        # entity id -> device id, and device id -> name usable on Wappsto.
+        self.entityDevice: dict[str, str | None] = {}
+        self.deviceNames: dict[str, str] = {}
+        # entity id -> handler and Value, the only lookup on a state change.
+        self.routes: dict[str, Route] = {}
+        self._unsub_state_tracker = None
+        self._unsub_started = None
+        self._unsubs = []
+        self.network = None
+        self.temp_device = None
+        # Resolved by the worker once connected, setup waits for it.
+        self.connected: Future = Future()
+        # Every wappstoiot call blocks on the network, so they are all run on
+        # the worker thread and the event loop only enqueues them.
+        self.worker = WappstoWorker()
+        pipelined = (
+            entry.options.get(TRANSMIT_MODE, DEFAULT_TRANSMIT_MODE)
+            == TRANSMIT_MODE_PIPELINED
+        )
+        self.reportQueue = ReportQueue(
+            self.hass,
+            self.worker,
+            entry.options.get(REPORT_INTERVAL, DEFAULT_REPORT_INTERVAL),
+            entry.options.get(MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT) if pipelined else 1,
+        )
+        self.handle_input = HandleInput(self.hass, self.reportQueue)
+        self.handle_binary_sensor = HandleBinarySensor(self.hass, self.reportQueue)
+        self.handle_sensor = HandleSensor(
+            self.hass, self.reportQueue, entry.options.get(VALUE_FILTERS)
+        )
+        self.handle_switch = HandleSwitch(self.hass, self.reportQueue)
+        self.handle_button = HandleButton(self.hass, self.reportQueue)
+        self.handle_light = HandleLight(self.hass, self.reportQueue)
+        self.handle_device_tracker = HandleDeviceTracker(self.hass, self.reportQueue)
 
         self.handlerDomain = {}
         self.handlerDomain[INPUT_BUTTON] = self.handle_input
@@ -76,85 +120,255 @@ class WappstoIoTApi:
         self.handlerDomain[BUTTON] = self.handle_button
         self.handlerDomain[DEVICE_TRACKER] = self.handle_device_tracker
 
-        wappstoiot.config(
-            config_folder=Path(__file__).parent.parent,
-            fast_send=False,
-        )
-        self.network = wappstoiot.createNetwork(name="HomeAssistant")
-        self.temp_device = self.network.createDevice("Default device")
-
-        def event_handler(event):
-            self.handleEvent(event)
+        self.worker.submit(self.connect, pipelined)
 
         def event_started(event):
             domain = event.data["domain"]
             _LOGGER.warning("Event started, domain: %s [%s]", domain, event)
 
+        @callback
         def event_ha_started(event):
             _LOGGER.info("HA started event")
+            # A listen_once listener must not be removed once it has fired.
+            self._unsub_started = None
             for values in self.entity_list:
-                self.createValue(values)
+                self.addEntity(values)
 
-        hass.bus.async_listen(event_type=EVENT_STATE_CHANGED, listener=event_handler)
-        hass.bus.async_listen(  # NOTE: et it to work to create the value!!
-            event_type=EVENT_SERVICE_REGISTERED, listener=event_started
-        )
+        @callback
+        def event_ha_stop(event):
+            self.close()
 
-        hass.bus.async_listen_once(
-            EVENT_HOMEASSISTANT_STARTED,
-            event_ha_started,
+        self.trackEntityList()
+        self._unsubs.append(
+            hass.bus.async_listen(  # NOTE: et it to work to create the value!!
+                event_type=EVENT_SERVICE_REGISTERED, listener=event_started
+            )
         )
 
-        hass.bus.async_listen(
-            event_type=EVENT_HOMEASSISTANT_STOP,
-            listener=lambda *args, **kwargs: wappstoiot.close(),
+        if hass.state is CoreState.running:
+            # Reloaded after start up, the started event will not come again.
+            event_ha_started(None)
+        else:
+            self._unsub_started = hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_STARTED,
+                event_ha_started,
+            )
+
+        self._unsubs.append(
+            hass.bus.async_listen(
+                event_type=EVENT_HOMEASSISTANT_STOP,
+                listener=event_ha_stop,
+            )
+        )
+        self._unsubs.append(
+            hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED,
+                self.handleEntityRegistryUpdated,
+                event_filter=self.isIndexedEntity,
+            )
+        )
+        self._unsubs.append(
+            hass.bus.async_listen(
+                dr.EVENT_DEVICE_REGISTRY_UPDATED,
+                self.handleDeviceRegistryUpdated,
+                event_filter=self.isIndexedDevice,
+            )
         )
+
+    def connect(self, fast_send: bool):
+        try:
+            wappstoiot.config(
+                config_folder=Path(__file__).parent.parent,
+                fast_send=fast_send,
+            )
+            network = wappstoiot.createNetwork(name="HomeAssistant")
+            # Devices and values get their connection from the network.
+            network.connection = ManifestConnection(network.connection, self.manifest)
+            self.temp_device = network.createDevice("Default device")
+        except Exception as err:
+            self.connected.set_exception(err)
+            return
+        self.network = network
         wappsto_connected_sensor.turn_on()
+        self.connected.set_result(None)
 
     def close(self):
-        wappstoiot.close()
+        if self._unsub_state_tracker:
+            self._unsub_state_tracker()
+            self._unsub_state_tracker = None
+        if self._unsub_started:
+            self._unsub_started()
+            self._unsub_started = None
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs.clear()
+        self.reportQueue.close()
+        self.worker.submit(wappstoiot.close)
+        self.worker.stop()
+
+    def trackEntityList(self):
+        """Only listen for state changes of the exported entities."""
+        if self._unsub_state_tracker:
+            self._unsub_state_tracker()
+        self._unsub_state_tracker = async_track_state_change_event(
+            self.hass, self.entity_list, self.handleEvent
+        )
+
+    def updateOptions(self, options: dict) -> bool:
+        """Apply changed options, return False if a reload is needed instead."""
+        changed = {
+            key
+            for key in set(options) | set(self.options)
+            if options.get(key) != self.options.get(key)
+        }
+        # Imported devices are updated by the from_wappsto side.
+        if changed - {ENTITY_LIST, "import_devices"}:
+            return False
+        self.options = dict(options)
+        if ENTITY_LIST in changed:
+            self.updateEntityList(options[ENTITY_LIST])
+        return True
 
     def updateEntityList(self, entity_list: list):
+        added = set(entity_list) - set(self.entity_list)
+        removed = set(self.entity_list) - set(entity_list)
+        _LOGGER.info("Export update, added: %s removed: %s", added, removed)
         self.entity_list = entity_list
-        for values in entity_list:
-            self.createValue(values)
+        self.trackEntityList()
+        for entity_id in removed:
+            self.routes.pop(entity_id, None)
+            self.entityDevice.pop(entity_id, None)
+            self.worker.submit(self.removeValue, entity_id)
+        for entity_id in added:
+            self.addEntity(entity_id)
 
-    def handleEvent(self, event):
-        entity_id = event.data.get("entity_id", "")
-        _LOGGER.info("Event id: %s [%s]", entity_id, event)
+    @callback
+    def addEntity(self, entity_id: str):
         (entity_type, entity_name) = entity_id.split(".")
-        if entity_type in SUPPORTED_DOMAINS:
-            self.updateValueReport(entity_id, event)
+        if entity_type not in SUPPORTED_DOMAINS:
+            return
+        self.routes[entity_id] = Route(self.handlerDomain[entity_type])
+        self.indexEntity(entity_id)
+        self.routes[entity_id].handler.prepareValue(entity_id)
+        self.worker.submit(self.createValue, entity_id)
 
-    def createOrGetDevice(self, entity_id: str) -> Device | None:
-        entity_list = er.async_get(self.hass)
-        tmp_entity = entity_list.async_get(entity_id)
+    @callback
+    def indexEntity(self, entity_id: str):
+        tmp_entity = er.async_get(self.hass).async_get(entity_id)
+        dev_id = tmp_entity.device_id if tmp_entity else None
+        self.entityDevice[entity_id] = dev_id or None
+        if dev_id and dev_id not in self.deviceNames:
+            self.indexDevice(dev_id)
 
-        if not tmp_entity:
-            return None
-        dev_id = tmp_entity.device_id
-        if not dev_id or len(dev_id) == 0:
-            return None
+    @callback
+    def indexDevice(self, dev_id: str):
+        tmp_dev = dr.async_get(self.hass).async_get(dev_id)
+        name = tmp_dev.name if tmp_dev else None
+        if not name:
+            self.deviceNames.pop(dev_id, None)
+            return
+        illegal = wappstoiot.utils.name_check.illegal_characters(name)
+        mapping_illegal = str.maketrans('', '', illegal)
+        self.deviceNames[dev_id] = name.translate(mapping_illegal)
+
+    @callback
+    def isIndexedEntity(self, event_data) -> bool:
+        return event_data["entity_id"] in self.entityDevice
+
+    @callback
+    def isIndexedDevice(self, event_data) -> bool:
+        return event_data["device_id"] in self.deviceNames
+
+    @callback
+    def handleEntityRegistryUpdated(self, event):
+        if event.data["action"] != "update":
+            return
+        if "device_id" not in event.data.get("changes", {}):
+            return
+        # Moved to another device, recreate the value under the new one.
+        entity_id = event.data["entity_id"]
+        self.indexEntity(entity_id)
+        if route := self.routes.get(entity_id):
+            route.handler.prepareValue(entity_id)
+        self.worker.submit(self.removeValue, entity_id)
+        self.worker.submit(self.createValue, entity_id)
+
+    @callback
+    def handleDeviceRegistryUpdated(self, event):
+        if event.data["action"] != "update":
+            return
+        if "name" not in event.data.get("changes", {}):
+            return
+        dev_id = event.data["device_id"]
+        old_name = self.deviceNames.get(dev_id)
+        self.indexDevice(dev_id)
+        new_name = self.deviceNames.get(dev_id)
+        if new_name == old_name:
+            return
+        if new_name:
+            # Renamed in place, the values keep their uuids and history.
+            self.worker.submit(self.renameDevice, dev_id, new_name)
+            return
+        entity_ids = [
+            entity_id
+            for entity_id, entity_dev_id in self.entityDevice.items()
+            if entity_dev_id == dev_id
+        ]
+        self.worker.submit(self.recreateDevice, dev_id, entity_ids)
+
+    def renameDevice(self, dev_id: str, name: str):
+        device = self.deviceList.get(dev_id)
+        if device is None:
+            return
+        old_name = device.name
+        device.element.name = name
+        if self.network.connection.put_device(device.uuid, device.element):
+            self.manifest.renameUuid(self.network.uuid, old_name, name)
+        else:
+            _LOGGER.warning("Could not rename Wappsto device '%s' to '%s'", old_name, name)
 
-        dev_list = dr.async_get(self.hass)
-        tmp_dev = dev_list.async_get(str(dev_id))
+    def recreateDevice(self, dev_id: str, entity_ids: list):
+        for entity_id in entity_ids:
+            self.removeValue(entity_id)
+        old_device = self.deviceList.pop(dev_id, None)
+        if old_device:
+            old_device.delete()
+        for entity_id in entity_ids:
+            self.createValue(entity_id)
 
-        if tmp_dev is None:
+    @callback
+    def handleEvent(self, event):
+        entity_id = event.data["entity_id"]
+        route = self.routes.get(entity_id)
+        if route is None or route.value is None:
+            return
+        new_state = event.data["new_state"]
+        if not new_state:
+            return
+        if not route.handler.hasReportChange(event.data["old_state"], new_state):
+            return
+        route.handler.getReport(route.value, entity_id, new_state.state, event)
+
+    def createOrGetDevice(self, entity_id: str) -> Device | None:
+        dev_id = self.entityDevice.get(entity_id)
+        if not dev_id:
             return None
-        name = tmp_dev.name
-        if name is None or len(name) == 0:
+        name = self.deviceNames.get(dev_id)
+        if not name:
             return None
 
         if not dev_id in self.deviceList:
-            illegal = wappstoiot.utils.name_check.illegal_characters(name)
-            mapping_illegal = str.maketrans('', '', illegal)
-            self.deviceList[dev_id] = self.network.createDevice(name.translate(mapping_illegal))
+            self.deviceList[dev_id] = self.network.createDevice(name)
 
         return self.deviceList[dev_id]
 
     def createValue(self, entity_id: str):
-        (entity_type, entity_name) = entity_id.split(".")
-        if entity_type in SUPPORTED_DOMAINS:
+        if self.network is None:
+            # Not connected, setup is failing and will be retried.
+            return
+        route = self.routes.get(entity_id)
+        if route is not None:
+            (entity_type, entity_name) = entity_id.split(".")
             use_device = self.createOrGetDevice(entity_id)
             if not use_device:
                 use_device = self.temp_device
@@ -167,15 +381,15 @@ class WappstoIoTApi:
                 )
                 initial_data = current_entity.state
 
-            self.handlerDomain[entity_type].createValue(
+            route.handler.createValue(
                 use_device, entity_type, entity_id, initial_data
             )
+            route.value = route.handler.valueList.get(entity_id)
 
-    def updateValueReport(self, entity_id, event):
-        if not event.data["new_state"]:
-            return
-        testing = event.data["new_state"].state
+    def removeValue(self, entity_id: str):
+        route = self.routes.get(entity_id)
+        if route is not None:
+            route.value = None
         (entity_type, entity_name) = entity_id.split(".")
-        self.handlerDomain[entity_type].getReport(
-            entity_type, entity_id, testing, event
-        )
+        if entity_type in SUPPORTED_DOMAINS:
+            self.handlerDomain[entity_type].removeValue(entity_id)
@@ -1,5 +1,6 @@
 import logging
-from homeassistant.core import Event, HomeAssistant
+from homeassistant import exceptions
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
 )
@@ -7,14 +8,20 @@ from homeassistant.helpers.entity import get_device_class
 import wappstoiot
 from wappstoiot import Device, Value
 from .handler import Handler
+from .report_queue import ReportQueue
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class HandleBinarySensor(Handler):
-    def __init__(self, hass: HomeAssistant) -> None:
+    coalesce = False
+
+    def __init__(self, hass: HomeAssistant, report_queue: ReportQueue) -> None:
         self.hass = hass
+        self.reportQueue = report_queue
         self.valueList: dict[str, Value] = {}
+        # entity id -> device class, resolved on the event loop.
+        self.deviceClasses: dict[str, str | None] = {}
         self.deviceClassMap = {
             BinarySensorDeviceClass.BATTERY: {
                 "map": {"0": "normal", "1": "low"},
@@ -130,6 +137,13 @@ class HandleBinarySensor(Handler):
             },
         }
 
+    @callback
+    def prepareValue(self, entity_id: str) -> None:
+        try:
+            self.deviceClasses[entity_id] = get_device_class(self.hass, entity_id)
+        except exceptions.HomeAssistantError:
+            self.deviceClasses[entity_id] = None
+
     # other helpers
     # def get_device_class(hass: HomeAssistant, entity_id: str)
     # def get_capability(hass: HomeAssistant, entity_id: str, capability: str)
@@ -139,7 +153,7 @@ class HandleBinarySensor(Handler):
     def createValue(
         self, device: Device, domain: str, entity_id: str, initial_data: str | None
     ) -> None:
-        device_class = get_device_class(self.hass, entity_id)
+        device_class = self.deviceClasses.get(entity_id)
 
         mapping = {"0": "off", "1": "on"}
         valType = "boolean"
@@ -165,12 +179,13 @@ class HandleBinarySensor(Handler):
         if initial_data:
             self.valueList[entity_id].report("1" if initial_data == "on" else "0")
 
-    def getReport(self, domain: str, entity_id: str, data: str, event: Event) -> None:
-        if not entity_id in self.valueList:
-            return
-        self.valueList[entity_id].report("1" if data == "on" else "0")
+    def getReport(self, value: Value, entity_id: str, data: str, event: Event) -> None:
+        self.reportQueue.report(
+            value, "1" if data == "on" else "0", self.reportTime(event), self.coalesce
+        )
 
     def removeValue(self, entity_id: str) -> None:
         if entity_id in self.valueList:
+            self.reportQueue.discard(self.valueList[entity_id])
             self.valueList[entity_id].delete()
             del self.valueList[entity_id]
@@ -5,13 +5,15 @@ from homeassistant.core import Event, HomeAssistant
 import wappstoiot
 from wappstoiot import Device, Value
 from .handler import Handler
+from .report_queue import ReportQueue
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class HandleDeviceTracker(Handler):
-    def __init__(self, hass: HomeAssistant) -> None:
+    def __init__(self, hass: HomeAssistant, report_queue: ReportQueue) -> None:
         self.hass = hass
+        self.reportQueue = report_queue
         self.valueList: dict[str, Value] = {}
 
     def createValue(
@@ -29,12 +31,13 @@ class HandleDeviceTracker(Handler):
         if initial_data:
             self.valueList[entity_id].report(initial_data)
 
-    def getReport(self, domain: str, entity_id: str, data: str, event: Event) -> None:
-        if not entity_id in self.valueList:
-            return
-        self.valueList[entity_id].report(data)
+    def getReport(self, value: Value, entity_id: str, data: str, event: Event) -> None:
+        self.reportQueue.report(
+            value, data, self.reportTime(event), self.coalesce
+        )
 
     def removeValue(self, entity_id: str) -> None:
         if entity_id in self.valueList:
+            self.reportQueue.discard(self.valueList[entity_id])
             self.valueList[entity_id].delete()
             del self.valueList[entity_id]
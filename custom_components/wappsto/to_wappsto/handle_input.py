@@ -6,14 +6,18 @@ from homeassistant.const import SERVICE_TURN_ON, SERVICE_TURN_OFF
 import wappstoiot
 from wappstoiot import Device, Value
 from .handler import Handler
+from .report_queue import ReportQueue
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class HandleInput(Handler):
-    def __init__(self, hass: HomeAssistant) -> None:
+    coalesce = False
+
+    def __init__(self, hass: HomeAssistant, report_queue: ReportQueue) -> None:
         self.valueList: dict[str, Value] = {}
         self.hass = hass
+        self.reportQueue = report_queue
 
     def createValue(
         self, device: Device, domain: str, entity_id: str, initial_data: str | None
@@ -68,12 +72,13 @@ class HandleInput(Handler):
                 self.valueList[entity_id].control("1" if initial_data == "on" else "0")
         self.valueList[entity_id].onControl(callback=setControl)
 
-    def getReport(self, domain: str, entity_id: str, data: str, event: Event) -> None:
-        if not entity_id in self.valueList:
-            return
-        self.valueList[entity_id].report("1" if data == "on" else "0")
+    def getReport(self, value: Value, entity_id: str, data: str, event: Event) -> None:
+        self.reportQueue.report(
+            value, "1" if data == "on" else "0", self.reportTime(event), self.coalesce
+        )
 
     def removeValue(self, entity_id: str) -> None:
         if entity_id in self.valueList:
+            self.reportQueue.discard(self.valueList[entity_id])
             self.valueList[entity_id].delete()
             del self.valueList[entity_id]
@@ -15,6 +15,7 @@ from homeassistant.components.light import (
 import wappstoiot
 from wappstoiot import Device, Value
 from .handler import Handler
+from .report_queue import ReportQueue
 
 ONOFF_VALUE = "onoff"
 BRIGHTNESS_VALUE = "brightness"
@@ -31,8 +32,11 @@ _LOGGER = logging.getLogger(__name__)
 
 
 class HandleLight(Handler):
-    def __init__(self, hass: HomeAssistant) -> None:
+    reportAttributes = ("brightness", "color_temp_kelvin", "rgb_color")
+
+    def __init__(self, hass: HomeAssistant, report_queue: ReportQueue) -> None:
         self.hass = hass
+        self.reportQueue = report_queue
         self.valueList: dict[str, dict[str, Value]] = {}
         self.enableConfigDebug = False
         self.enableEventDebug = False
@@ -288,18 +292,20 @@ class HandleLight(Handler):
             )
         self.valueList[entity_id][ONOFF_VALUE].onControl(callback=setControl)
 
-    def getReport(self, domain: str, entity_id: str, data: str, event: Event) -> None:
-        if entity_id not in self.valueList:
-            return
-
+    def getReport(
+        self, value: dict[str, Value], entity_id: str, data: str, event: Event
+    ) -> None:
         _LOGGER.warning("Testing light event: [%s]", entity_id)
+        timestamp = self.reportTime(event)
 
         ## Update onoff, must exist
-        if self.valueList[entity_id][ONOFF_VALUE]:
-            self.valueList[entity_id][ONOFF_VALUE].report("1" if data == "on" else "0")
+        if value[ONOFF_VALUE]:
+            self.reportQueue.report(
+                value[ONOFF_VALUE], "1" if data == "on" else "0", timestamp
+            )
 
         if self.enableEventDebug:
-            self.valueList[entity_id]["debug"].report(str(event))
+            self.reportQueue.report(value["debug"], str(event), timestamp)
 
         new_state = event.data.get("new_state")
         if new_state is None:
@@ -307,38 +313,37 @@ class HandleLight(Handler):
             return
 
         ## Update brightness if exist
-        if self.valueList[entity_id].get(
-            BRIGHTNESS_VALUE
-        ) is not None and new_state.attributes.get("brightness"):
+        if value.get(BRIGHTNESS_VALUE) is not None and new_state.attributes.get(
+            "brightness"
+        ):
             _LOGGER.warning(
                 "Testing light brightness: [%s]",
                 new_state.attributes.get("brightness"),
             )
 
-            self.valueList[entity_id][BRIGHTNESS_VALUE].report(
-                new_state.attributes.get("brightness")
+            self.reportQueue.report(
+                value[BRIGHTNESS_VALUE],
+                new_state.attributes.get("brightness"),
+                timestamp,
             )
 
         ## Update color temperature if exist
         temp_color = new_state.attributes.get("color_temp_kelvin")
-        if (
-            self.valueList[entity_id].get(COLOR_TEMP_VALUE) is not None
-            and temp_color is not None
-        ):
-            self.valueList[entity_id][COLOR_TEMP_VALUE].report(temp_color)
+        if value.get(COLOR_TEMP_VALUE) is not None and temp_color is not None:
+            self.reportQueue.report(value[COLOR_TEMP_VALUE], temp_color, timestamp)
 
         ## Update color if exist
         rgb_color = new_state.attributes.get("rgb_color")
-        if (
-            self.valueList[entity_id].get(COLOR_VALUE) is not None
-            and rgb_color is not None
-        ):
-            self.valueList[entity_id][COLOR_VALUE].report(
-                self.convert_rgb_to_hex(rgb_color)
+        if value.get(COLOR_VALUE) is not None and rgb_color is not None:
+            self.reportQueue.report(
+                value[COLOR_VALUE],
+                self.convert_rgb_to_hex(rgb_color),
+                timestamp,
             )
 
     def removeValue(self, entity_id: str) -> None:
         if entity_id in self.valueList:
             for value in self.valueList[entity_id].values():
+                self.reportQueue.discard(value)
                 value.delete()
             del self.valueList[entity_id]
@@ -1,39 +1,85 @@
 import logging
+import time
+from datetime import datetime
+from functools import partial
 
 import wappstoiot
 from homeassistant import exceptions
 from homeassistant.components.sensor import SensorDeviceClass
-from homeassistant.core import Event, HomeAssistant
+from homeassistant.core import Event, HassJob, HomeAssistant, callback
 from homeassistant.helpers.entity import get_device_class, get_unit_of_measurement
+from homeassistant.helpers.event import async_call_later
 from wappstoiot import Device, Value, ValueTemplate
 
+from ..const import (
+    FILTER_DELTA,
+    FILTER_DELTA_TYPE,
+    FILTER_PERIOD,
+    DELTA_ABSOLUTE,
+    DELTA_PERCENT,
+)
 from .handler import Handler
+from .report_queue import ReportQueue
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class HandleSensor(Handler):
-    def __init__(self, hass: HomeAssistant) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        report_queue: ReportQueue,
+        value_filters: dict[str, dict] | None = None,
+    ) -> None:
         self.hass = hass
+        self.reportQueue = report_queue
         self.valueList: dict[str, Value] = {}
+        # Deadband and minimum period, keyed by entity id or device class.
+        self.valueFilters = value_filters or {}
+        self.filterList: dict[str, dict] = {}
+        self.lastReport: dict[str, tuple[float, float]] = {}
+        # Latest report held back by the minimum period, sent when it ends.
+        self.trailing: dict[str, tuple[Value, str, datetime | None]] = {}
+        # entity id -> device class and unit, resolved on the event loop.
+        self.entityInfo: dict[str, tuple[str | None, str | None]] = {}
+
+    @callback
+    def prepareValue(self, entity_id: str) -> None:
+        try:
+            self.entityInfo[entity_id] = (
+                get_device_class(self.hass, entity_id),
+                get_unit_of_measurement(self.hass, entity_id),
+            )
+        except exceptions.HomeAssistantError:
+            self.entityInfo.pop(entity_id, None)
 
     def createValue(
         self, device: Device, domain: str, entity_id: str, initial_data: str | None
     ) -> None:
         valType = "unknown"
         createString = False
-        try:
-            device_class = get_device_class(self.hass, entity_id)
-            if device_class:
-                valType = device_class
-                if (
-                    SensorDeviceClass(device_class) == SensorDeviceClass.TIMESTAMP
-                    or SensorDeviceClass(device_class) == SensorDeviceClass.DATE
-                ):
-                    createString = True
-        except exceptions.HomeAssistantError as e:
+        info = self.entityInfo.get(entity_id)
+        if info is None:
             _LOGGER.error("Could not get device for entity: %s", entity_id)
             return None
+        (device_class, measure) = info
+        if device_class:
+            valType = device_class
+            if (
+                SensorDeviceClass(device_class) == SensorDeviceClass.TIMESTAMP
+                or SensorDeviceClass(device_class) == SensorDeviceClass.DATE
+            ):
+                createString = True
+
+        valueFilter = self.valueFilters.get(entity_id) or self.valueFilters.get(
+            valType
+        )
+        if valueFilter:
+            self.filterList[entity_id] = valueFilter
+        else:
+            self.filterList.pop(entity_id, None)
+        self.lastReport.pop(entity_id, None)
+        self.trailing.pop(entity_id, None)
 
         if createString:
             # noinspection PyTypeChecker
@@ -48,8 +94,6 @@ class HandleSensor(Handler):
                 self.valueList[entity_id].report(initial_data)
             return None
 
-        measure = get_unit_of_measurement(self.hass, entity_id)
-
         # noinspection PyTypeChecker
         self.valueList[entity_id] = device.createNumberValue(
             name=entity_id,
@@ -59,8 +103,14 @@ class HandleSensor(Handler):
             max=100 if measure == "%" else 60000,
             step=0.001,
             unit=measure if isinstance(measure, str) else "",
+            # The minimum period is applied here, Wappsto's period is a refresh timer.
             period="0",
-            delta="0",
+            delta=(
+                str(valueFilter.get(FILTER_DELTA, 0))
+                if valueFilter
+                and valueFilter.get(FILTER_DELTA_TYPE, DELTA_ABSOLUTE) == DELTA_ABSOLUTE
+                else "0"
+            ),
         )
         if initial_data:
             try:
@@ -72,17 +122,72 @@ class HandleSensor(Handler):
                     initial_data,
                 )
 
-    def getReport(self, domain: str, entity_id: str, data: str, event: Event) -> None:
-        if not entity_id in self.valueList:
+    def getReport(self, value: Value, entity_id: str, data: str, event: Event) -> None:
+        timestamp = self.reportTime(event)
+        valueFilter = self.filterList.get(entity_id)
+        if valueFilter:
+            remaining = self.periodRemaining(entity_id, valueFilter, data)
+            if remaining > 0:
+                scheduled = entity_id in self.trailing
+                self.trailing[entity_id] = (value, data, timestamp)
+                if not scheduled:
+                    async_call_later(
+                        self.hass,
+                        remaining,
+                        HassJob(partial(self.reportTrailing, entity_id)),
+                    )
+                return
+            self.trailing.pop(entity_id, None)
+            if not self.passesFilter(entity_id, valueFilter, data):
+                return
+        self.reportQueue.report(value, data, timestamp, self.coalesce)
+
+    @callback
+    def reportTrailing(self, entity_id: str, _now) -> None:
+        pending = self.trailing.pop(entity_id, None)
+        valueFilter = self.filterList.get(entity_id)
+        if pending is None or valueFilter is None:
             return
+        (value, data, timestamp) = pending
+        if self.passesFilter(entity_id, valueFilter, data):
+            self.reportQueue.report(value, data, timestamp, self.coalesce)
+
+    def periodRemaining(self, entity_id: str, value_filter: dict, data: str) -> float:
+        last = self.lastReport.get(entity_id)
+        if last is None:
+            return 0
         try:
-            self.valueList[entity_id].report(data)
+            float(data)
         except ValueError:
-            _LOGGER.warning(
-                "Could not report new state for '%s': value is '%s'.", entity_id, data
-            )
+            # Non-numeric states like 'unavailable' are always reported.
+            return 0
+        return value_filter.get(FILTER_PERIOD, 0) - (time.monotonic() - last[1])
+
+    def passesFilter(self, entity_id: str, value_filter: dict, data: str) -> bool:
+        try:
+            number = float(data)
+        except ValueError:
+            self.lastReport.pop(entity_id, None)
+            return True
+
+        now = time.monotonic()
+        last = self.lastReport.get(entity_id)
+        if last is not None:
+            (lastNumber, lastTime) = last
+            delta = value_filter.get(FILTER_DELTA, 0)
+            if value_filter.get(FILTER_DELTA_TYPE, DELTA_ABSOLUTE) == DELTA_PERCENT:
+                delta = abs(lastNumber) * delta / 100
+            if abs(number - lastNumber) < delta:
+                return False
+
+        self.lastReport[entity_id] = (number, now)
+        return True
 
     def removeValue(self, entity_id: str) -> None:
         if entity_id in self.valueList:
+            self.reportQueue.discard(self.valueList[entity_id])
             self.valueList[entity_id].delete()
             del self.valueList[entity_id]
+        self.filterList.pop(entity_id, None)
+        self.lastReport.pop(entity_id, None)
+        self.trailing.pop(entity_id, None)
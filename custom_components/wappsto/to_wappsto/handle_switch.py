@@ -6,13 +6,15 @@ from homeassistant.const import SERVICE_TURN_ON, SERVICE_TURN_OFF
 import wappstoiot
 from wappstoiot import Device, Value
 from .handler import Handler
+from .report_queue import ReportQueue
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class HandleSwitch(Handler):
-    def __init__(self, hass: HomeAssistant) -> None:
+    def __init__(self, hass: HomeAssistant, report_queue: ReportQueue) -> None:
         self.hass = hass
+        self.reportQueue = report_queue
         self.valueList: dict[str, Value] = {}
 
     def createValue(
@@ -49,12 +51,13 @@ class HandleSwitch(Handler):
             self.valueList[entity_id].control("1" if initial_data == "on" else "0")
         self.valueList[entity_id].onControl(callback=setControl)
 
-    def getReport(self, domain: str, entity_id: str, data: str, event: Event) -> None:
-        if not entity_id in self.valueList:
-            return
-        self.valueList[entity_id].report("1" if data == "on" else "0")
+    def getReport(self, value: Value, entity_id: str, data: str, event: Event) -> None:
+        self.reportQueue.report(
+            value, "1" if data == "on" else "0", self.reportTime(event), self.coalesce
+        )
 
     def removeValue(self, entity_id: str) -> None:
         if entity_id in self.valueList:
+            self.reportQueue.discard(self.valueList[entity_id])
             self.valueList[entity_id].delete()
             del self.valueList[entity_id]
@@ -1,8 +1,13 @@
 from abc import ABC, abstractmethod
-from homeassistant.core import HomeAssistant, Event
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant, Event, State, callback
 
 from wappstoiot import Device, Value
 
+from .report_queue import ReportQueue
+
 # from homeassistant.helpers.entity import get_device_class, get_capability, get_supported_features, get_unit_of_measurement
 #
 # def get_device_class(hass: HomeAssistant, entity_id: str)
@@ -12,10 +17,20 @@ from wappstoiot import Device, Value
 
 
 class Handler(ABC):
+    # The parts of a state that are mapped to Wappsto values.
+    reportState: bool = True
+    reportAttributes: tuple[str, ...] = ()
+    # False where each change is the signal itself, so none may be dropped.
+    coalesce: bool = True
+
     @abstractmethod
-    def __init__(self, hass: HomeAssistant) -> None:
+    def __init__(self, hass: HomeAssistant, report_queue: ReportQueue) -> None:
         pass
 
+    @callback
+    def prepareValue(self, entity_id: str) -> None:
+        """Look up registry metadata on the event loop, before createValue."""
+
     @abstractmethod
     def createValue(
         self, device: Device, domain: str, entity_id: str, initial_data: str | None
@@ -23,5 +38,34 @@ class Handler(ABC):
         pass
 
     @abstractmethod
-    def getReport(self, domain: str, entity_id: str, data: str, event: Event) -> str:
+    def getReport(self, value: Any, entity_id: str, data: str, event: Event) -> None:
+        pass
+
+    @abstractmethod
+    def removeValue(self, entity_id: str) -> None:
         pass
+
+    def reportTime(self, event: Event) -> datetime | None:
+        new_state = event.data.get("new_state")
+        return new_state.last_updated if new_state else None
+
+    def hasReportChange(self, old_state: State | None, new_state: State) -> bool:
+        if old_state is None:
+            return True
+        if self.reportState and old_state.state != new_state.state:
+            return True
+        return any(
+            old_state.attributes.get(attribute) != new_state.attributes.get(attribute)
+            for attribute in self.reportAttributes
+        )
+
+
+class Route:
+    """Where the state changes of one exported entity are reported."""
+
+    __slots__ = ("handler", "value")
+
+    def __init__(self, handler: Handler) -> None:
+        self.handler = handler
+        # The handler's Value, or dict of Values, once it has been created.
+        self.value: Any = None
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Any
+from uuid import UUID
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from ..const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+
+
+def definitionHash(data: Any) -> str:
+    """Hash the parts of a device or value that make up its schema."""
+    definition = data.model_dump(
+        mode="json",
+        exclude={"meta", "state", "value", "device"},
+        exclude_none=True,
+    )
+    return hashlib.sha1(
+        json.dumps(definition, sort_keys=True).encode()
+    ).hexdigest()
+
+
+class ProvisionManifest:
+    """Persisted uuids and schema hashes of everything posted to Wappsto."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.manifest")
+        self._lock = threading.Lock()
+        # "<parent uuid>/<name>" -> uuid
+        self.uuids: dict[str, str] = {}
+        # uuid -> definition hash
+        self.hashes: dict[str, str] = {}
+
+    async def async_load(self) -> None:
+        data = await self._store.async_load()
+        if data:
+            self.uuids = data.get("uuids", {})
+            self.hashes = data.get("hashes", {})
+
+    async def async_remove(self) -> None:
+        await self._store.async_remove()
+
+    def getUuid(self, parent_uuid: UUID, name: str) -> UUID | None:
+        uuid = self.uuids.get(f"{parent_uuid}/{name}")
+        return UUID(uuid) if uuid else None
+
+    def setUuid(self, parent_uuid: UUID, name: str, uuid: UUID) -> None:
+        with self._lock:
+            self.uuids[f"{parent_uuid}/{name}"] = str(uuid)
+        self._save()
+
+    def renameUuid(self, parent_uuid: UUID, old_name: str, new_name: str) -> None:
+        with self._lock:
+            uuid = self.uuids.pop(f"{parent_uuid}/{old_name}", None)
+            if uuid is not None:
+                self.uuids[f"{parent_uuid}/{new_name}"] = uuid
+        self._save()
+
+    def isUnchanged(self, uuid: UUID, definition_hash: str) -> bool:
+        return self.hashes.get(str(uuid)) == definition_hash
+
+    def setHash(self, uuid: UUID, definition_hash: str) -> None:
+        with self._lock:
+            self.hashes[str(uuid)] = definition_hash
+        self._save()
+
+    def forget(self, uuid: UUID) -> None:
+        with self._lock:
+            self.hashes.pop(str(uuid), None)
+            for key in [key for key, value in self.uuids.items() if value == str(uuid)]:
+                del self.uuids[key]
+        self._save()
+
+    def _dataToSave(self) -> dict:
+        with self._lock:
+            return {"uuids": dict(self.uuids), "hashes": dict(self.hashes)}
+
+    def _save(self) -> None:
+        self.hass.loop.call_soon_threadsafe(
+            self._store.async_delay_save, self._dataToSave, SAVE_DELAY
+        )
+
+
+class ManifestConnection:
+    """Wrap the wappstoiot connection, to reuse what the manifest knows.
+
+    Known devices and values are found without searching for their name,
+    and a schema is only posted again when its definition has changed.
+    """
+
+    def __init__(self, connection: Any, manifest: ProvisionManifest) -> None:
+        self._connection = connection
+        self.manifest = manifest
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+    def get_device_where(self, network_uuid: UUID, **kwargs: str) -> UUID | None:
+        return self._getWhere(
+            self._connection.get_device_where, network_uuid, **kwargs
+        )
+
+    def get_value_where(self, device_uuid: UUID, **kwargs: str) -> UUID | None:
+        return self._getWhere(self._connection.get_value_where, device_uuid, **kwargs)
+
+    def get_device(self, uuid: UUID) -> Any:
+        return self._get(self._connection.get_device, uuid)
+
+    def get_value(self, uuid: UUID) -> Any:
+        return self._get(self._connection.get_value, uuid)
+
+    def post_device(self, network_uuid: UUID, data: Any) -> bool:
+        return self._post(self._connection.post_device, network_uuid, data)
+
+    def post_value(self, device_uuid: UUID, data: Any) -> bool:
+        return self._post(self._connection.post_value, device_uuid, data)
+
+    def put_device(self, uuid: UUID, data: Any) -> bool:
+        result = self._connection.put_device(uuid, data)
+        if result:
+            self.manifest.setHash(uuid, definitionHash(data))
+        return result
+
+    def delete_device(self, uuid: UUID) -> bool:
+        self.manifest.forget(uuid)
+        return self._connection.delete_device(uuid)
+
+    def delete_value(self, uuid: UUID) -> bool:
+        self.manifest.forget(uuid)
+        return self._connection.delete_value(uuid)
+
+    def _getWhere(self, get_where, parent_uuid: UUID, **kwargs: str) -> UUID | None:
+        name = kwargs.get("name")
+        if name is None:
+            return get_where(parent_uuid, **kwargs)
+        uuid = self.manifest.getUuid(parent_uuid, name)
+        if uuid is not None:
+            return uuid
+        uuid = get_where(parent_uuid, **kwargs)
+        if uuid is not None:
+            self.manifest.setUuid(parent_uuid, name, uuid)
+        return uuid
+
+    def _get(self, get, uuid: UUID) -> Any:
+        element = get(uuid)
+        if element is None:
+            # Deleted on Wappsto, it has to be created again.
+            self.manifest.forget(uuid)
+        return element
+
+    def _post(self, post, parent_uuid: UUID, data: Any) -> bool:
+        uuid = data.meta.id
+        definition_hash = definitionHash(data)
+        if self.manifest.isUnchanged(uuid, definition_hash):
+            _LOGGER.debug("Schema of %s is unchanged, not posting it", uuid)
+            return True
+        result = post(parent_uuid, data)
+        if result:
+            self.manifest.setUuid(parent_uuid, data.name, uuid)
+            self.manifest.setHash(uuid, definition_hash)
+        return result
@@ -0,0 +1,140 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from wappstoiot import LogValue, Value
+
+from .worker import WappstoWorker
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ReportQueue:
+    """Coalesce reports, so only the latest pending data per value is sent.
+
+    Values whose every change matters, like buttons, keep all their pending
+    reports instead, and send them together in one bulk report.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        worker: WappstoWorker,
+        interval: float,
+        max_in_flight: int = 1,
+    ) -> None:
+        self.hass = hass
+        self.worker = worker
+        self.interval = interval
+        self._executor = None
+        if max_in_flight > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_in_flight, thread_name_prefix="wappsto_report"
+            )
+        # Value -> pending (data, timestamp) reports, oldest first.
+        self.pending: dict[Value, list[tuple[Any, datetime]]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_submitted = False
+        self._unsub_interval = None
+        if interval > 0:
+            self._unsub_interval = async_track_time_interval(
+                hass, self._flushInterval, timedelta(seconds=interval)
+            )
+
+    def report(
+        self,
+        value: Value,
+        data: Any,
+        timestamp: datetime | None = None,
+        coalesce: bool = True,
+    ) -> None:
+        # Stamped when the state changed, not when the report is sent.
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc)
+        # wappstoiot keeps its timestamps in naive UTC.
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        immediate = self.interval <= 0
+        with self._lock:
+            # Without an interval every report is sent, none are coalesced.
+            if (coalesce and not immediate) or value not in self.pending:
+                self.pending[value] = [(data, timestamp)]
+            else:
+                self.pending[value].append((data, timestamp))
+            if not immediate or self._flush_submitted:
+                return
+            self._flush_submitted = True
+        # Reports made while the worker is busy are sent by the same flush,
+        # pipelined when maxInFlight allows it.
+        if not self.worker.submit(self.flush):
+            with self._lock:
+                self._flush_submitted = False
+
+    def discard(self, value: Value) -> None:
+        with self._lock:
+            self.pending.pop(value, None)
+
+    def flush(self) -> None:
+        # Skip the tick if the previous flush is still sending, otherwise an
+        # older report could overtake a newer one for the same value.
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                pending, self.pending = self.pending, {}
+                self._flush_submitted = False
+            if self._executor is None:
+                for value, samples in pending.items():
+                    self._send(value, samples)
+                return
+            # Pipelined: at most maxInFlight reports are awaiting their reply.
+            for _ in self._executor.map(lambda item: self._send(*item), pending.items()):
+                pass
+        finally:
+            self._flush_lock.release()
+
+    def close(self) -> None:
+        if self._unsub_interval:
+            self._unsub_interval()
+            self._unsub_interval = None
+        self.worker.submit(self._closeWorker)
+
+    def _closeWorker(self) -> None:
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @callback
+    def _flushInterval(self, now) -> None:
+        self.worker.submit(self.flush)
+
+    def _send(self, value: Value, samples: list[tuple[Any, datetime]]) -> None:
+        try:
+            if len(samples) == 1:
+                (data, timestamp) = samples[0]
+                value.report(data, timestamp)
+            else:
+                value.report(
+                    [
+                        LogValue(data=str(data), timestamp=timestamp)
+                        for (data, timestamp) in samples
+                    ]
+                )
+        except ValueError:
+            _LOGGER.warning(
+                "Could not report new state for '%s': value is '%s'.",
+                value.name,
+                samples[-1][0],
+            )
+        except Exception as err:
+            # Timed out or disconnected, the other values of the flush are
+            # still sent and this one is retried with the next flush.
+            _LOGGER.warning("Could not report new state for '%s': %s", value.name, err)
+            with self._lock:
+                self.pending.setdefault(value, samples)
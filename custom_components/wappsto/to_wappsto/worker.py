@@ -0,0 +1,62 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10000
+
+
+class WappstoWorker:
+    """Run all wappstoiot calls in order on one dedicated thread."""
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="wappsto_worker", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> bool:
+        """Enqueue a call without waiting for it; return False if dropped."""
+        if self._stopping:
+            return False
+        try:
+            self._queue.put_nowait((func, args))
+        except queue.Full:
+            _LOGGER.error(
+                "Wappsto worker queue is full, dropping call to %s", func.__name__
+            )
+            return False
+        return True
+
+    def stop(self) -> None:
+        """Stop the thread once the already queued calls are done."""
+        if self._stopping:
+            return
+        self._stopping = True
+        # A full queue must not block the caller, the thread is then told to
+        # stop through the flag once it has drained the queue.
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def join(self, timeout: float | None = None) -> None:
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=1 if self._stopping else None)
+            except queue.Empty:
+                return
+            if item is None:
+                return
+            (func, args) = item
+            try:
+                func(*args)
+            except Exception:
+                _LOGGER.exception("Error while calling %s", func.__name__)